@@ -1,7 +1,7 @@
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, ORJSONResponse
 from tortoise.contrib.fastapi import register_tortoise
 
 from .routes.auth import router as auth_router
@@ -13,11 +13,15 @@ from .routes.salary_templates import router as salary_templates_router
 import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(__file__)))
-from config import CORS_ORIGINS, DB_PATH
+from config import CORS_ORIGINS, ensure_db_dir
 
 
 def create_app() -> FastAPI:
-    app = FastAPI(title="Salarium", version="0.1.0")
+    app = FastAPI(
+        title="Salarium",
+        version="0.1.0",
+        default_response_class=ORJSONResponse,
+    )
 
     app.add_middleware(
         CORSMiddleware,
@@ -55,7 +59,7 @@ def create_app() -> FastAPI:
 
     register_tortoise(
         app,
-        db_url=f"sqlite://{DB_PATH}",
+        db_url=f"sqlite://{ensure_db_dir()}",
         modules={"models": [
             "app.models.user",
             "app.models.person",
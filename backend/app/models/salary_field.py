@@ -45,6 +45,10 @@ class SalaryField(Model):
     class Meta:
         table = "salary_fields"
         unique_together = ("user_id", "field_key")
+        # Hot lookup: a user's active field definitions. The unique
+        # constraints already index salary_records (person_id, year, month)
+        # and custom_salary_values by salary_record_id.
+        indexes = (("user_id", "is_active"),)
 
 
 class CustomSalaryValue(Model):
@@ -3,6 +3,7 @@ from typing import List
 
 from ..models import Person
 from ..schemas.person import PersonCreate, PersonUpdate, PersonOut
+from ..services.stats_cache import invalidate_user_stats
 from ..utils.auth import get_current_user
 
 
@@ -75,4 +76,5 @@ async def delete_person(person_id: int, user=Depends(get_current_user)):
     deleted = await Person.filter(id=person_id, user_id=user.id).delete()
     if not deleted:
         raise HTTPException(status_code=404, detail="人员不存在")
+    invalidate_user_stats(user.id)
     return {"ok": True}
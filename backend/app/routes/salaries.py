@@ -1,26 +1,168 @@
 from typing import List, Optional, Dict, Tuple
 from fastapi import APIRouter, HTTPException, Query, Depends, UploadFile, File
-from fastapi.responses import Response, HTMLResponse
+from fastapi.responses import (
+    Response,
+    HTMLResponse,
+    ORJSONResponse,
+    StreamingResponse,
+)
+from openpyxl import Workbook, load_workbook
+from tortoise import connections, timezone
 from tortoise.exceptions import IntegrityError
-from decimal import Decimal
+from tortoise.transactions import in_transaction
+import csv
 import io
-import pandas as pd
+import numpy as np
 
 from ..models import (
     SalaryRecord,
     Person,
-    SalaryField,
     CustomSalaryValue,
     INCOME_CATEGORIES,
     DEDUCTION_CATEGORIES,
 )
 from ..schemas.salary import SalaryCreate, SalaryUpdate, SalaryOut
-from ..services.payroll import compute_payroll
+from ..services.payroll import (
+    PAYROLL_FIXED_FIELDS,
+    compute_payroll,
+    compute_payroll_batch,
+)
+from ..services.salary_fields import get_user_field_map, load_user_field_map
+from ..services.stats_cache import invalidate_user_stats
 from ..utils.auth import get_current_user
 
 
 router = APIRouter()
 
+# Flush streamed CSV exports in chunks of roughly this many characters
+_EXPORT_CHUNK_SIZE = 64 * 1024
+
+# Salary records joined with their custom values; one row per custom value,
+# or a single row with NULL custom columns when a record has none.
+_SALARIES_WITH_CUSTOM_SQL = (
+    "SELECT sr.id, sr.person_id, sr.year, sr.month,"
+    " sr.base_salary, sr.performance_salary, sr.pension_insurance,"
+    " sr.medical_insurance, sr.unemployment_insurance,"
+    " sr.critical_illness_insurance, sr.enterprise_annuity, sr.housing_fund,"
+    " sr.tax, sr.note,"
+    " sf.field_key, sf.field_type, sf.is_non_cash, cv.amount"
+    " FROM salary_records sr"
+    " JOIN persons p ON p.id = sr.person_id"
+    " LEFT JOIN custom_salary_values cv ON cv.salary_record_id = sr.id"
+    " LEFT JOIN salary_fields sf ON sf.id = cv.salary_field_id"
+    " WHERE p.user_id = ?"
+)
+
+
+INCOME_LABEL_MAP = dict(INCOME_CATEGORIES)
+DEDUCTION_LABEL_MAP = dict(DEDUCTION_CATEGORIES)
+
+# Columns read for single-record responses (SalaryOut and payslips)
+_SALARY_OUT_FIELDS = ("id", "year", "month", *PAYROLL_FIXED_FIELDS, "note")
+
+# Payslip layouts are static; only the placeholders change per record.
+_PAYSLIP_SVG_TEMPLATE = """\
+<svg xmlns="http://www.w3.org/2000/svg" width="720" height="460"
+ viewBox="0 0 720 460">
+  <rect x="20" y="20" width="680" height="420" rx="16"
+    fill="#fffdfb" stroke="#e5e0dc" />
+  <text x="40" y="60" font-family="ui-serif, Georgia, serif"
+    font-size="20" fill="#2d2a26">{title}</text>
+  <text x="40" y="90" font-family="system-ui, sans-serif"
+    font-size="18" fill="#2d2a26">实发：¥ {net:.2f}</text>
+  <line x1="40" y1="110" x2="680" y2="110" stroke="#eee7e2"/>
+  <text x="40" y="140" font-family="system-ui, sans-serif"
+    font-size="16" fill="#2d2a26">基本工资</text>
+  <text x="200" y="140" font-family="system-ui, sans-serif"
+    font-size="16" fill="#2d2a26">¥ {base_salary:.2f}</text>
+  <text x="40" y="165" font-family="system-ui, sans-serif"
+    font-size="16" fill="#2d2a26">绩效工资</text>
+  <text x="200" y="165" font-family="system-ui, sans-serif"
+    font-size="16" fill="#2d2a26">¥ {performance_salary:.2f}</text>
+  <text x="40" y="195" font-family="system-ui, sans-serif"
+    font-size="16" fill="#2d2a26">养老保险</text>
+  <text x="200" y="195" font-family="system-ui, sans-serif"
+    font-size="16" fill="#2d2a26">¥ {pension_insurance:.2f}</text>
+  <text x="40" y="215" font-family="system-ui, sans-serif"
+    font-size="16" fill="#2d2a26">医疗保险</text>
+  <text x="200" y="215" font-family="system-ui, sans-serif"
+    font-size="16" fill="#2d2a26">¥ {medical_insurance:.2f}</text>
+  <text x="40" y="235" font-family="system-ui, sans-serif"
+    font-size="16" fill="#2d2a26">失业保险</text>
+  <text x="200" y="235" font-family="system-ui, sans-serif"
+    font-size="16" fill="#2d2a26">¥ {unemployment_insurance:.2f}</text>
+  <text x="40" y="255" font-family="system-ui, sans-serif"
+    font-size="16" fill="#2d2a26">大病保险</text>
+  <text x="200" y="255" font-family="system-ui, sans-serif"
+    font-size="16" fill="#2d2a26">¥ {critical_illness_insurance:.2f}</text>
+  <text x="40" y="275" font-family="system-ui, sans-serif"
+    font-size="16" fill="#2d2a26">企业年金</text>
+  <text x="200" y="275" font-family="system-ui, sans-serif"
+    font-size="16" fill="#2d2a26">¥ {enterprise_annuity:.2f}</text>
+  <text x="40" y="295" font-family="system-ui, sans-serif"
+    font-size="16" fill="#2d2a26">公积金</text>
+  <text x="200" y="295" font-family="system-ui, sans-serif"
+    font-size="16" fill="#2d2a26">¥ {housing_fund:.2f}</text>
+  <text x="40" y="325" font-family="system-ui, sans-serif"
+    font-size="16" fill="#2d2a26">个税</text>
+  <text x="200" y="325" font-family="system-ui, sans-serif"
+    font-size="16" fill="#2d2a26">¥ {tax:.2f}</text>
+  <text x="40" y="360" font-family="system-ui, sans-serif"
+    font-size="12" fill="#9a9590">备注 {note}</text>
+</svg>"""
+
+_PAYSLIP_HTML_TEMPLATE = """\
+<!doctype html>
+<html lang="zh-CN">
+<head>
+  <meta charset="utf-8"/>
+  <title>{title}</title>
+  <style>
+    body{{font-family:-apple-system,BlinkMacSystemFont,'Segoe UI',sans-serif;
+    background:#f6f1ec;color:#2d2a26;padding:24px;}}
+    .card{{max-width:720px;margin:0 auto;background:#fffdfb;
+    border:1px solid #e5e0dc;border-radius:16px;padding:24px;}}
+    h1{{font-size:20px;margin:0 0 8px;font-family:ui-serif, Georgia, serif;}}
+    .net{{font-size:18px;margin:8px 0 16px;}}
+    .row{{display:flex;justify-content:space-between;padding:8px 0;
+    border-bottom:1px solid #f1ebe7;}}
+    .muted{{color:#6b6560;font-size:13px;}}
+    .actions{{display:flex;gap:8px;margin:16px 0;}}
+    .btn{{display:inline-flex;align-items:center;justify-content:center;
+    height:32px;padding:0 12px;box-sizing:border-box;
+    border:1px solid #e5e0dc;border-radius:8px;
+    background:#f5f3f1;color:#2d2a26;text-decoration:none;
+    font-size:14px;line-height:1;}}
+    .btn:hover{{background:#eee7e2;}}
+    @media print{{.actions{{display:none;}}}}
+  </style>
+</head>
+<body>
+  <div class="card">
+    <h1>{title}</h1>
+    <div class="net">实发：¥ {net:.2f}</div>
+    <div class="row"><span>基本工资</span><span>¥ {base_salary:.2f}</span></div>
+    <div class="row"><span>绩效工资</span><span>¥ {performance_salary:.2f}</span></div>
+    <div class="row"><span>养老保险</span><span>¥ {pension_insurance:.2f}</span></div>
+    <div class="row"><span>医疗保险</span><span>¥ {medical_insurance:.2f}</span></div>
+    <div class="row"><span>失业保险</span>\
+<span>¥ {unemployment_insurance:.2f}</span></div>
+    <div class="row"><span>大病保险</span>\
+<span>¥ {critical_illness_insurance:.2f}</span></div>
+    <div class="row"><span>企业年金</span><span>¥ {enterprise_annuity:.2f}</span></div>
+    <div class="row"><span>公积金</span><span>¥ {housing_fund:.2f}</span></div>
+    <div class="row"><span>个税</span><span>¥ {tax:.2f}</span></div>
+    <div class="muted">备注：{note}</div>
+    <div class="actions">
+      <button class="btn" onclick="window.print()">打印/保存为PDF</button>
+      <a class="btn" id="payslip-svg-link" \
+href="/api/salaries/{record_id}/payslip.svg" download>
+        下载图片(SVG)</a>
+    </div>
+  </div>
+</body>
+</html>"""
+
 
 async def load_custom_fields(
     record_ids: List[int],
@@ -29,23 +171,25 @@ async def load_custom_fields(
     if not record_ids:
         return {}, {}
 
-    values = await CustomSalaryValue.filter(
-        salary_record_id__in=record_ids
-    ).prefetch_related("salary_field").all()
+    rows = await CustomSalaryValue.filter(salary_record_id__in=record_ids).values(
+        "salary_record_id",
+        "amount",
+        "salary_field__field_key",
+        "salary_field__field_type",
+        "salary_field__is_non_cash",
+    )
 
     by_record: Dict[int, Dict[str, float]] = {}
-    for v in values:
-        by_record.setdefault(v.salary_record_id, {})[v.salary_field.field_key] = float(
-            v.amount
-        )
-
     payroll_by_record: Dict[int, List[dict]] = {}
-    for v in values:
-        payroll_by_record.setdefault(v.salary_record_id, []).append(
+    for r in rows:
+        record_id = r["salary_record_id"]
+        amount = float(r["amount"])
+        by_record.setdefault(record_id, {})[r["salary_field__field_key"]] = amount
+        payroll_by_record.setdefault(record_id, []).append(
             {
-                "field_type": v.salary_field.field_type,
-                "is_non_cash": v.salary_field.is_non_cash,
-                "amount": float(v.amount),
+                "field_type": r["salary_field__field_type"],
+                "is_non_cash": r["salary_field__is_non_cash"],
+                "amount": amount,
             }
         )
 
@@ -56,63 +200,80 @@ async def save_custom_fields(
     record_id: int, user_id: int, custom_fields: dict
 ) -> None:
     """Save custom field values for a salary record."""
-    if not custom_fields:
+    await save_custom_fields_bulk({record_id: custom_fields}, user_id)
+
+
+async def save_custom_fields_bulk(
+    per_record_customs: Dict[int, dict], user_id: int
+) -> None:
+    """Replace custom field values for many salary records at once.
+
+    Records mapped to an empty dict are left untouched, as before.
+    """
+    per_record_customs = {rid: cf for rid, cf in per_record_customs.items() if cf}
+    if not per_record_customs:
         return
 
     # Get user's field definitions
-    field_defs = await SalaryField.filter(user_id=user_id, is_active=True).all()
-    field_map = {f.field_key: f for f in field_defs}
+    field_ids, _ = await load_user_field_map(user_id)
 
-    # Delete existing custom values for this record
-    await CustomSalaryValue.filter(salary_record_id=record_id).delete()
+    # Delete existing custom values for these records
+    await CustomSalaryValue.filter(
+        salary_record_id__in=list(per_record_customs)
+    ).delete()
 
     # Create new custom values
-    for field_key, amount in custom_fields.items():
-        if field_key in field_map and amount != 0:
-            await CustomSalaryValue.create(
-                salary_record_id=record_id,
-                salary_field_id=field_map[field_key].id,
-                amount=amount,
-            )
+    instances = [
+        CustomSalaryValue(
+            salary_record_id=record_id,
+            salary_field_id=field_ids[field_key],
+            amount=amount,
+        )
+        for record_id, custom_fields in per_record_customs.items()
+        for field_key, amount in custom_fields.items()
+        if field_key in field_ids and amount != 0
+    ]
+    if instances:
+        await CustomSalaryValue.bulk_create(instances, batch_size=500)
 
 
 def build_salary_out(
-    rec: SalaryRecord,
+    rec: dict,
     custom_fields_data: Dict[str, float],
     custom_fields_payroll: List[dict],
 ) -> SalaryOut:
     insurance_total = (
-        rec.pension_insurance
-        + rec.medical_insurance
-        + rec.unemployment_insurance
-        + rec.critical_illness_insurance
-        + rec.enterprise_annuity
-        + rec.housing_fund
+        rec["pension_insurance"]
+        + rec["medical_insurance"]
+        + rec["unemployment_insurance"]
+        + rec["critical_illness_insurance"]
+        + rec["enterprise_annuity"]
+        + rec["housing_fund"]
     )
     data = compute_payroll(
-        base_salary=rec.base_salary,
-        performance_salary=rec.performance_salary,
-        pension_insurance=rec.pension_insurance,
-        medical_insurance=rec.medical_insurance,
-        unemployment_insurance=rec.unemployment_insurance,
-        critical_illness_insurance=rec.critical_illness_insurance,
-        enterprise_annuity=rec.enterprise_annuity,
-        housing_fund=rec.housing_fund,
-        tax=rec.tax,
+        base_salary=rec["base_salary"],
+        performance_salary=rec["performance_salary"],
+        pension_insurance=rec["pension_insurance"],
+        medical_insurance=rec["medical_insurance"],
+        unemployment_insurance=rec["unemployment_insurance"],
+        critical_illness_insurance=rec["critical_illness_insurance"],
+        enterprise_annuity=rec["enterprise_annuity"],
+        housing_fund=rec["housing_fund"],
+        tax=rec["tax"],
         custom_fields=custom_fields_payroll or [],
     )
     return SalaryOut(
-        id=rec.id,
-        year=rec.year,
-        month=rec.month,
-        base_salary=rec.base_salary,
-        performance_salary=rec.performance_salary,
-        pension_insurance=rec.pension_insurance,
-        medical_insurance=rec.medical_insurance,
-        unemployment_insurance=rec.unemployment_insurance,
-        critical_illness_insurance=rec.critical_illness_insurance,
-        enterprise_annuity=rec.enterprise_annuity,
-        housing_fund=rec.housing_fund,
+        id=rec["id"],
+        year=rec["year"],
+        month=rec["month"],
+        base_salary=rec["base_salary"],
+        performance_salary=rec["performance_salary"],
+        pension_insurance=rec["pension_insurance"],
+        medical_insurance=rec["medical_insurance"],
+        unemployment_insurance=rec["unemployment_insurance"],
+        critical_illness_insurance=rec["critical_illness_insurance"],
+        enterprise_annuity=rec["enterprise_annuity"],
+        housing_fund=rec["housing_fund"],
         insurance_total=insurance_total,
         tax=data["tax"],
         total_income=data["total_income"],
@@ -121,78 +282,176 @@ def build_salary_out(
         net_income=data["net_income"],
         actual_take_home=data["actual_take_home"],
         non_cash_benefits=data["non_cash_benefits"],
-        note=rec.note,
+        note=rec["note"],
         custom_fields=custom_fields_data or {},
     )
 
 
-def _category_label_map(categories):
-    return {k: v for k, v in categories}
+async def load_salaries_with_custom_fields(
+    user_id: int,
+    person_id: Optional[int] = None,
+    year: Optional[int] = None,
+    month: Optional[int] = None,
+) -> Tuple[List[dict], Dict[int, Dict[str, float]], Dict[int, List[dict]]]:
+    """Load salary rows and their custom values with one LEFT JOIN query.
 
+    Returns the same ``(records, by_record, payroll_by_record)`` shapes as a
+    record query followed by load_custom_fields, with records as plain dicts.
+    """
+    sql = _SALARIES_WITH_CUSTOM_SQL
+    params: List[int] = [user_id]
+    if person_id:
+        sql += " AND sr.person_id = ?"
+        params.append(person_id)
+    if year:
+        sql += " AND sr.year = ?"
+        params.append(year)
+    if month:
+        sql += " AND sr.month = ?"
+        params.append(month)
+    sql += " ORDER BY sr.id"
+    rows = await connections.get("default").execute_query_dict(sql, params)
 
-def _decimal_to_float(value):
-    if isinstance(value, Decimal):
-        return float(value)
-    return value
-
+    records: Dict[int, dict] = {}
+    by_record: Dict[int, Dict[str, float]] = {}
+    payroll_by_record: Dict[int, List[dict]] = {}
+    for row in rows:
+        record_id = row["id"]
+        if record_id not in records:
+            records[record_id] = row
+        if row["field_key"] is None:
+            continue
+        amount = float(row["amount"])
+        by_record.setdefault(record_id, {})[row["field_key"]] = amount
+        payroll_by_record.setdefault(record_id, []).append(
+            {
+                "field_type": row["field_type"],
+                "is_non_cash": bool(row["is_non_cash"]),
+                "amount": amount,
+            }
+        )
+    return list(records.values()), by_record, payroll_by_record
+
+
+def build_salary_outs(
+    records: List[dict],
+    custom_data_map: Dict[int, Dict[str, float]],
+    custom_payroll_map: Dict[int, List[dict]],
+) -> List[SalaryOut]:
+    """Batch variant of build_salary_out computing payroll for all records."""
+    if not records:
+        return []
+    fixed = np.asarray(
+        [[float(r[f]) for f in PAYROLL_FIXED_FIELDS] for r in records],
+        dtype=np.float64,
+    )
+    data = compute_payroll_batch(
+        fixed, [custom_payroll_map.get(r["id"], []) for r in records]
+    )
+    # Plain Python floats of the declared types, so the models can be built
+    # with model_construct and skip re-validating values computed here.
+    insurance_total = fixed[:, 2:8].sum(axis=1).round(2).tolist()
+    data = {k: v.tolist() for k, v in data.items()}
+    outs = []
+    for i, (rec, row) in enumerate(zip(records, fixed.tolist())):
+        outs.append(
+            SalaryOut.model_construct(
+                id=rec["id"],
+                year=rec["year"],
+                month=rec["month"],
+                base_salary=row[0],
+                performance_salary=row[1],
+                pension_insurance=row[2],
+                medical_insurance=row[3],
+                unemployment_insurance=row[4],
+                critical_illness_insurance=row[5],
+                enterprise_annuity=row[6],
+                housing_fund=row[7],
+                insurance_total=insurance_total[i],
+                tax=data["tax"][i],
+                total_income=data["total_income"][i],
+                total_deductions=data["total_deductions"][i],
+                gross_income=data["gross_income"][i],
+                net_income=data["net_income"][i],
+                actual_take_home=data["actual_take_home"][i],
+                non_cash_benefits=data["non_cash_benefits"][i],
+                note=rec["note"],
+                custom_fields=custom_data_map.get(rec["id"], {}),
+            )
+        )
+    return outs
 
-async def _payslip_context(rec: SalaryRecord, user_id: int):
-    values = await CustomSalaryValue.filter(
-        salary_record_id=rec.id
-    ).prefetch_related("salary_field").all()
 
-    custom_fields = [
-        {
-            "name": v.salary_field.name,
-            "field_type": v.salary_field.field_type,
-            "category": v.salary_field.category,
-            "amount": float(v.amount),
-        }
-        for v in values
-    ]
+async def _payslip_context(rec: dict, user_id: int):
+    values = await CustomSalaryValue.filter(salary_record_id=rec["id"]).values(
+        "amount",
+        "salary_field__name",
+        "salary_field__field_type",
+        "salary_field__category",
+        "salary_field__is_non_cash",
+    )
 
-    custom_payroll = [
-        {
-            "field_type": v.salary_field.field_type,
-            "is_non_cash": v.salary_field.is_non_cash,
-            "amount": float(v.amount),
-        }
-        for v in values
-    ]
+    custom_fields = []
+    custom_payroll = []
+    for v in values:
+        amount = float(v["amount"])
+        field_type = v["salary_field__field_type"]
+        custom_fields.append(
+            {
+                "name": v["salary_field__name"],
+                "field_type": field_type,
+                "category": v["salary_field__category"],
+                "amount": amount,
+            }
+        )
+        custom_payroll.append(
+            {
+                "field_type": field_type,
+                "is_non_cash": v["salary_field__is_non_cash"],
+                "amount": amount,
+            }
+        )
 
     calc = compute_payroll(
-        base_salary=rec.base_salary,
-        performance_salary=rec.performance_salary,
-        pension_insurance=rec.pension_insurance,
-        medical_insurance=rec.medical_insurance,
-        unemployment_insurance=rec.unemployment_insurance,
-        critical_illness_insurance=rec.critical_illness_insurance,
-        enterprise_annuity=rec.enterprise_annuity,
-        housing_fund=rec.housing_fund,
-        tax=rec.tax,
+        base_salary=rec["base_salary"],
+        performance_salary=rec["performance_salary"],
+        pension_insurance=rec["pension_insurance"],
+        medical_insurance=rec["medical_insurance"],
+        unemployment_insurance=rec["unemployment_insurance"],
+        critical_illness_insurance=rec["critical_illness_insurance"],
+        enterprise_annuity=rec["enterprise_annuity"],
+        housing_fund=rec["housing_fund"],
+        tax=rec["tax"],
         custom_fields=custom_payroll,
     )
 
-    income_labels = _category_label_map(INCOME_CATEGORIES)
-    deduction_labels = _category_label_map(DEDUCTION_CATEGORIES)
-
     return {
-        "year": rec.year,
-        "month": rec.month,
-        "base_salary": float(rec.base_salary),
-        "performance_salary": float(rec.performance_salary),
-        "pension_insurance": float(rec.pension_insurance),
-        "medical_insurance": float(rec.medical_insurance),
-        "unemployment_insurance": float(rec.unemployment_insurance),
-        "critical_illness_insurance": float(rec.critical_illness_insurance),
-        "enterprise_annuity": float(rec.enterprise_annuity),
-        "housing_fund": float(rec.housing_fund),
-        "tax": float(rec.tax),
-        "note": rec.note or "",
+        "year": rec["year"],
+        "month": rec["month"],
+        "base_salary": float(rec["base_salary"]),
+        "performance_salary": float(rec["performance_salary"]),
+        "pension_insurance": float(rec["pension_insurance"]),
+        "medical_insurance": float(rec["medical_insurance"]),
+        "unemployment_insurance": float(rec["unemployment_insurance"]),
+        "critical_illness_insurance": float(rec["critical_illness_insurance"]),
+        "enterprise_annuity": float(rec["enterprise_annuity"]),
+        "housing_fund": float(rec["housing_fund"]),
+        "tax": float(rec["tax"]),
+        "note": rec["note"] or "",
         "custom_fields": custom_fields,
         "calc": calc,
-        "income_labels": income_labels,
-        "deduction_labels": deduction_labels,
+        "income_labels": INCOME_LABEL_MAP,
+        "deduction_labels": DEDUCTION_LABEL_MAP,
+    }
+
+
+def _payslip_fields(ctx: dict, record_id: int) -> dict:
+    """Flatten a payslip context into the template placeholders."""
+    return {
+        **ctx,
+        "title": f"{ctx['year']}年{ctx['month']}月 工资条",
+        "net": ctx["calc"]["actual_take_home"],
+        "record_id": record_id,
     }
 
 
@@ -203,24 +462,15 @@ async def list_salaries(
     year: Optional[int] = Query(default=None),
     month: Optional[int] = Query(default=None),
 ):
-    q = SalaryRecord.filter(person__user_id=user.id)
-    if person_id:
-        q = q.filter(person_id=person_id)
-    if year:
-        q = q.filter(year=year)
-    if month:
-        q = q.filter(month=month)
-    records = await q.all()
-    record_ids = [r.id for r in records]
-    custom_data_map, custom_payroll_map = await load_custom_fields(record_ids)
-    return [
-        build_salary_out(
-            r,
-            custom_data_map.get(r.id, {}),
-            custom_payroll_map.get(r.id, []),
+    records, custom_data_map, custom_payroll_map = (
+        await load_salaries_with_custom_fields(
+            user.id, person_id=person_id, year=year, month=month
         )
-        for r in records
-    ]
+    )
+    outs = build_salary_outs(records, custom_data_map, custom_payroll_map)
+    # The outs are already SalaryOut models of the right types; return them so
+    # FastAPI skips re-validating the whole list against response_model.
+    return ORJSONResponse([o.model_dump(mode="json") for o in outs])
 
 
 @router.get("/export")
@@ -238,60 +488,121 @@ async def export_salaries(
         q = q.filter(year=year)
     if month:
         q = q.filter(month=month)
-    records = await q.all()
+    records = await q.values_list(
+        "id", "person_id", "year", "month", *PAYROLL_FIXED_FIELDS, "note"
+    )
+    # Cast every Decimal amount column in one vectorised pass
+    amounts = np.array([r[4:-1] for r in records], dtype=object).astype(np.float64)
 
-    record_ids = [r.id for r in records]
+    record_ids = [r[0] for r in records]
     custom_data_map, _ = await load_custom_fields(record_ids)
 
-    fields = await SalaryField.filter(user_id=user.id, is_active=True).all()
-    custom_keys = [f.field_key for f in fields]
-
-    rows = []
-    for r in records:
-        row = {
-            "person_id": r.person_id,
-            "year": r.year,
-            "month": r.month,
-            "base_salary": _decimal_to_float(r.base_salary),
-            "performance_salary": _decimal_to_float(r.performance_salary),
-            "pension_insurance": _decimal_to_float(r.pension_insurance),
-            "medical_insurance": _decimal_to_float(r.medical_insurance),
-            "unemployment_insurance": _decimal_to_float(r.unemployment_insurance),
-            "critical_illness_insurance": _decimal_to_float(
-                r.critical_illness_insurance
-            ),
-            "enterprise_annuity": _decimal_to_float(r.enterprise_annuity),
-            "housing_fund": _decimal_to_float(r.housing_fund),
-            "tax": _decimal_to_float(r.tax),
-            "note": r.note or "",
-        }
-        custom_fields = custom_data_map.get(r.id, {})
-        for key in custom_keys:
-            row[key] = custom_fields.get(key, 0)
-        rows.append(row)
+    field_ids, _ = await get_user_field_map(user.id)
+    custom_keys = list(field_ids)
+
+    header = [
+        "person_id",
+        "year",
+        "month",
+        "base_salary",
+        "performance_salary",
+        "pension_insurance",
+        "medical_insurance",
+        "unemployment_insurance",
+        "critical_illness_insurance",
+        "enterprise_annuity",
+        "housing_fund",
+        "tax",
+        "note",
+        *custom_keys,
+    ]
+
+    def export_rows():
+        for (rid, pid, y, m, *_, note), row_amounts in zip(records, amounts.tolist()):
+            custom_fields = custom_data_map.get(rid, {})
+            yield [
+                pid,
+                y,
+                m,
+                *row_amounts,
+                note or "",
+                *(custom_fields.get(key, 0.0) for key in custom_keys),
+            ]
 
-    df = pd.DataFrame(rows)
     if format == "xlsx":
+        wb = Workbook(write_only=True)
+        ws = wb.create_sheet("Sheet1")
+        ws.append(header)
+        for row in export_rows():
+            ws.append(row)
         buf = io.BytesIO()
-        df.to_excel(buf, index=False)
-        buf.seek(0)
+        wb.save(buf)
         return Response(
-            buf.read(),
+            buf.getvalue(),
             media_type=(
                 "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
             ),
             headers={"Content-Disposition": "attachment; filename=salaries.xlsx"},
         )
 
-    buf = io.StringIO()
-    df.to_csv(buf, index=False)
-    return Response(
-        buf.getvalue(),
+    def csv_chunks():
+        buf = io.StringIO()
+        writer = csv.writer(buf, lineterminator="\n")
+        writer.writerow(header)
+        for row in export_rows():
+            writer.writerow(row)
+            if buf.tell() >= _EXPORT_CHUNK_SIZE:
+                yield buf.getvalue()
+                buf.seek(0)
+                buf.truncate()
+        yield buf.getvalue()
+
+    return StreamingResponse(
+        csv_chunks(),
         media_type="text/csv",
         headers={"Content-Disposition": "attachment; filename=salaries.csv"},
     )
 
 
+def read_import_rows(file: UploadFile) -> Tuple[List[str], List[dict]]:
+    """Read an uploaded CSV/XLSX sheet into its header and one dict per row."""
+    if file.filename.endswith(".xlsx"):
+        wb = load_workbook(file.file, read_only=True, data_only=True)
+        try:
+            sheet_rows = wb.worksheets[0].iter_rows(values_only=True)
+            # Pair values with the unfiltered header row so a blank header
+            # cell drops only its own column instead of shifting the rest.
+            raw_header = next(sheet_rows, ())
+            header = [str(h) for h in raw_header if h is not None]
+            rows = [
+                {str(h): v for h, v in zip(raw_header, values) if h is not None}
+                for values in sheet_rows
+                if any(v is not None for v in values)
+            ]
+        finally:
+            wb.close()
+        return header, rows
+
+    reader = csv.DictReader(
+        io.TextIOWrapper(file.file, encoding="utf-8-sig", newline="")
+    )
+    rows = list(reader)
+    return list(reader.fieldnames or []), rows
+
+
+def _import_int(line: int, column: str, value) -> int:
+    """Parse an integer import cell, accepting spreadsheet floats like 3.0."""
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        number = None
+    if number is None or not number.is_integer():
+        raise HTTPException(
+            status_code=400, detail=f"第 {line} 行 {column} 无效: {value}"
+        )
+    return int(number)
+
+
 @router.post("/import")
 async def import_salaries(
     file: UploadFile = File(...),
@@ -299,38 +610,67 @@ async def import_salaries(
     person_id: Optional[int] = Query(default=None),
     mode: str = Query(default="upsert"),  # upsert | skip | error
 ):
-    if file.filename.endswith(".xlsx"):
-        df = pd.read_excel(file.file)
-    else:
-        df = pd.read_csv(file.file)
+    columns, rows = read_import_rows(file)
 
-    fields = await SalaryField.filter(user_id=user.id, is_active=True).all()
-    custom_keys = {f.field_key for f in fields}
+    field_ids, _ = await load_user_field_map(user.id)
+    custom_keys = set(field_ids)
+
+    col_set = set(columns)
+    has_note = "note" in col_set
+    amount_cols_present = col_set.intersection(PAYROLL_FIXED_FIELDS)
+    custom_cols_present = list(custom_keys & col_set)
 
     required_cols = {"year", "month"}
-    missing = [c for c in required_cols if c not in df.columns]
+    missing = [c for c in required_cols if c not in col_set]
     if missing:
         raise HTTPException(status_code=400, detail=f"缺少字段: {missing}")
 
+    # Line numbers count the header as line 1, as spreadsheets show them
+    row_keys = [
+        (
+            _import_int(line, "person_id", row.get("person_id") or person_id or 0),
+            _import_int(line, "year", row.get("year")),
+            _import_int(line, "month", row.get("month")),
+        )
+        for line, row in enumerate(rows, start=2)
+    ]
+    row_person_ids = [pid for pid, _, _ in row_keys]
+
+    # Preload everything the row loop needs so it never touches the DB
+    allowed_person_ids = set(
+        await Person.filter(
+            user_id=user.id, id__in=list(set(row_person_ids))
+        ).values_list("id", flat=True)
+    )
+    years = {y for _, y, _ in row_keys}
+    months = {m for _, _, m in row_keys}
+    existing_map: Dict[Tuple[int, int, int], SalaryRecord] = {
+        (r.person_id, r.year, r.month): r
+        for r in await SalaryRecord.filter(
+            person_id__in=list(allowed_person_ids),
+            year__in=list(years),
+            month__in=list(months),
+        )
+    }
+
     created = 0
     updated = 0
     skipped = 0
 
-    for _, row in df.iterrows():
-        row_person_id = int(row.get("person_id") or person_id or 0)
+    to_create: Dict[Tuple[int, int, int], SalaryRecord] = {}
+    to_update: Dict[Tuple[int, int, int], SalaryRecord] = {}
+    customs_by_key: Dict[Tuple[int, int, int], Dict[str, float]] = {}
+
+    for (row_person_id, year, month), row in zip(row_keys, rows):
         if not row_person_id:
             raise HTTPException(status_code=400, detail="缺少 person_id")
 
-        person = await Person.filter(id=row_person_id, user_id=user.id).first()
-        if not person:
+        if row_person_id not in allowed_person_ids:
             raise HTTPException(status_code=404, detail=f"人员不存在: {row_person_id}")
 
-        year = int(row.get("year"))
-        month = int(row.get("month"))
+        key = (row_person_id, year, month)
 
-        existing = await SalaryRecord.filter(
-            person_id=row_person_id, year=year, month=month
-        ).first()
+        existing = existing_map.get(key) or to_create.get(key)
 
         if existing and mode == "skip":
             skipped += 1
@@ -342,28 +682,19 @@ async def import_salaries(
             )
 
         data = {
-            "base_salary": float(row.get("base_salary") or 0),
-            "performance_salary": float(row.get("performance_salary") or 0),
-            "pension_insurance": float(row.get("pension_insurance") or 0),
-            "medical_insurance": float(row.get("medical_insurance") or 0),
-            "unemployment_insurance": float(row.get("unemployment_insurance") or 0),
-            "critical_illness_insurance": float(
-                row.get("critical_illness_insurance") or 0
-            ),
-            "enterprise_annuity": float(row.get("enterprise_annuity") or 0),
-            "housing_fund": float(row.get("housing_fund") or 0),
-            "tax": float(row.get("tax") or 0),
-            "note": row.get("note") if "note" in df.columns else None,
+            c: float(row.get(c) or 0) if c in amount_cols_present else 0.0
+            for c in PAYROLL_FIXED_FIELDS
         }
+        data["note"] = (row.get("note") or None) if has_note else None
 
         if existing:
             for k, v in data.items():
                 setattr(existing, k, v)
-            await existing.save()
-            rec = existing
+            if key in existing_map:
+                to_update[key] = existing
             updated += 1
         else:
-            rec = await SalaryRecord.create(
+            to_create[key] = SalaryRecord(
                 person_id=row_person_id,
                 year=year,
                 month=month,
@@ -371,12 +702,45 @@ async def import_salaries(
             )
             created += 1
 
-        custom_fields = {}
-        for key in custom_keys:
-            if key in df.columns:
-                custom_fields[key] = float(row.get(key) or 0)
-        await save_custom_fields(rec.id, user.id, custom_fields)
+        customs_by_key[key] = {k: float(row.get(k) or 0) for k in custom_cols_present}
 
+    # Validation is done; apply all writes atomically so a failure cannot leave
+    # records without their custom values.
+    async with in_transaction():
+        if to_update:
+            await SalaryRecord.bulk_update(
+                list(to_update.values()),
+                fields=[*PAYROLL_FIXED_FIELDS, "note"],
+                batch_size=500,
+            )
+            # bulk_update serialises datetimes as 'YYYY-MM-DDTHH:MM:SS', unlike
+            # save()/update(), so bump updated_at through a regular update to
+            # keep the stored text format (and its ordering) consistent.
+            update_ids = [rec.id for rec in to_update.values()]
+            now = timezone.now()
+            for i in range(0, len(update_ids), 500):
+                await SalaryRecord.filter(id__in=update_ids[i : i + 500]).update(
+                    updated_at=now
+                )
+        if to_create:
+            await SalaryRecord.bulk_create(list(to_create.values()), batch_size=500)
+
+        # bulk_create does not populate primary keys, so resolve ids in one query
+        record_ids = {key: rec.id for key, rec in to_update.items()}
+        if to_create:
+            for rid, pid, y, m in await SalaryRecord.filter(
+                person_id__in=list({k[0] for k in to_create}),
+                year__in=list({k[1] for k in to_create}),
+                month__in=list({k[2] for k in to_create}),
+            ).values_list("id", "person_id", "year", "month"):
+                if (pid, y, m) in to_create:
+                    record_ids[(pid, y, m)] = rid
+
+        await save_custom_fields_bulk(
+            {record_ids[key]: cf for key, cf in customs_by_key.items()}, user.id
+        )
+
+    invalidate_user_stats(user.id)
     return {"created": created, "updated": updated, "skipped": skipped}
 
 
@@ -410,10 +774,11 @@ async def create_salary(
     # Save custom fields
     if payload.custom_fields:
         await save_custom_fields(rec.id, user.id, payload.custom_fields)
+    invalidate_user_stats(user.id)
 
     custom_data_map, custom_payroll_map = await load_custom_fields([rec.id])
     return build_salary_out(
-        rec,
+        {f: getattr(rec, f) for f in _SALARY_OUT_FIELDS},
         custom_data_map.get(rec.id, {}),
         custom_payroll_map.get(rec.id, []),
     )
@@ -421,157 +786,46 @@ async def create_salary(
 
 @router.get("/{record_id}", response_model=SalaryOut)
 async def get_salary(record_id: int, user=Depends(get_current_user)):
-    rec = await SalaryRecord.filter(id=record_id, person__user_id=user.id).first()
+    rec = (
+        await SalaryRecord.filter(id=record_id, person__user_id=user.id)
+        .first()
+        .values(*_SALARY_OUT_FIELDS)
+    )
     if not rec:
         raise HTTPException(status_code=404, detail="记录不存在")
-    custom_data_map, custom_payroll_map = await load_custom_fields([rec.id])
+    custom_data_map, custom_payroll_map = await load_custom_fields([rec["id"]])
     return build_salary_out(
         rec,
-        custom_data_map.get(rec.id, {}),
-        custom_payroll_map.get(rec.id, []),
+        custom_data_map.get(rec["id"], {}),
+        custom_payroll_map.get(rec["id"], []),
     )
 
 
 @router.get("/{record_id}/payslip.svg")
 async def payslip_svg(record_id: int, user=Depends(get_current_user)):
-    rec = await SalaryRecord.filter(id=record_id, person__user_id=user.id).first()
+    rec = (
+        await SalaryRecord.filter(id=record_id, person__user_id=user.id)
+        .first()
+        .values(*_SALARY_OUT_FIELDS)
+    )
     if not rec:
         raise HTTPException(status_code=404, detail="记录不存在")
     ctx = await _payslip_context(rec, user.id)
-
-    title = f"{ctx['year']}年{ctx['month']}月 工资条"
-    net = ctx["calc"]["actual_take_home"]
-    svg_lines = [
-        '<svg xmlns="http://www.w3.org/2000/svg" width="720" height="460"',
-        ' viewBox="0 0 720 460">',
-        '  <rect x="20" y="20" width="680" height="420" rx="16"',
-        '    fill="#fffdfb" stroke="#e5e0dc" />',
-        '  <text x="40" y="60" font-family="ui-serif, Georgia, serif"',
-        f'    font-size="20" fill="#2d2a26">{title}</text>',
-        '  <text x="40" y="90" font-family="system-ui, sans-serif"',
-        f'    font-size="18" fill="#2d2a26">实发：¥ {net:.2f}</text>',
-        '  <line x1="40" y1="110" x2="680" y2="110" stroke="#eee7e2"/>',
-        '  <text x="40" y="140" font-family="system-ui, sans-serif"',
-        '    font-size="16" fill="#2d2a26">基本工资</text>',
-        '  <text x="200" y="140" font-family="system-ui, sans-serif"',
-        f'    font-size="16" fill="#2d2a26">¥ {ctx["base_salary"]:.2f}</text>',
-        '  <text x="40" y="165" font-family="system-ui, sans-serif"',
-        '    font-size="16" fill="#2d2a26">绩效工资</text>',
-        '  <text x="200" y="165" font-family="system-ui, sans-serif"',
-        f'    font-size="16" fill="#2d2a26">¥ {ctx["performance_salary"]:.2f}</text>',
-        '  <text x="40" y="195" font-family="system-ui, sans-serif"',
-        '    font-size="16" fill="#2d2a26">养老保险</text>',
-        '  <text x="200" y="195" font-family="system-ui, sans-serif"',
-        f'    font-size="16" fill="#2d2a26">¥ {ctx["pension_insurance"]:.2f}</text>',
-        '  <text x="40" y="215" font-family="system-ui, sans-serif"',
-        '    font-size="16" fill="#2d2a26">医疗保险</text>',
-        '  <text x="200" y="215" font-family="system-ui, sans-serif"',
-        f'    font-size="16" fill="#2d2a26">¥ {ctx["medical_insurance"]:.2f}</text>',
-        '  <text x="40" y="235" font-family="system-ui, sans-serif"',
-        '    font-size="16" fill="#2d2a26">失业保险</text>',
-        '  <text x="200" y="235" font-family="system-ui, sans-serif"',
-        (
-            '    font-size="16" fill="#2d2a26">¥ '
-            f'{ctx["unemployment_insurance"]:.2f}</text>'
-        ),
-        '  <text x="40" y="255" font-family="system-ui, sans-serif"',
-        '    font-size="16" fill="#2d2a26">大病保险</text>',
-        '  <text x="200" y="255" font-family="system-ui, sans-serif"',
-        (
-            '    font-size="16" fill="#2d2a26">¥ '
-            f'{ctx["critical_illness_insurance"]:.2f}</text>'
-        ),
-        '  <text x="40" y="275" font-family="system-ui, sans-serif"',
-        '    font-size="16" fill="#2d2a26">企业年金</text>',
-        '  <text x="200" y="275" font-family="system-ui, sans-serif"',
-        f'    font-size="16" fill="#2d2a26">¥ {ctx["enterprise_annuity"]:.2f}</text>',
-        '  <text x="40" y="295" font-family="system-ui, sans-serif"',
-        '    font-size="16" fill="#2d2a26">公积金</text>',
-        '  <text x="200" y="295" font-family="system-ui, sans-serif"',
-        f'    font-size="16" fill="#2d2a26">¥ {ctx["housing_fund"]:.2f}</text>',
-        '  <text x="40" y="325" font-family="system-ui, sans-serif"',
-        '    font-size="16" fill="#2d2a26">个税</text>',
-        '  <text x="200" y="325" font-family="system-ui, sans-serif"',
-        f'    font-size="16" fill="#2d2a26">¥ {ctx["tax"]:.2f}</text>',
-        '  <text x="40" y="360" font-family="system-ui, sans-serif"',
-        f'    font-size="12" fill="#9a9590">备注 {ctx["note"]}</text>',
-        "</svg>",
-    ]
-    svg = "\n".join(svg_lines)
+    svg = _PAYSLIP_SVG_TEMPLATE.format_map(_payslip_fields(ctx, rec["id"]))
     return Response(svg, media_type="image/svg+xml")
 
 
 @router.get("/{record_id}/payslip.html")
 async def payslip_html(record_id: int, user=Depends(get_current_user)):
-    rec = await SalaryRecord.filter(id=record_id, person__user_id=user.id).first()
+    rec = (
+        await SalaryRecord.filter(id=record_id, person__user_id=user.id)
+        .first()
+        .values(*_SALARY_OUT_FIELDS)
+    )
     if not rec:
         raise HTTPException(status_code=404, detail="记录不存在")
     ctx = await _payslip_context(rec, user.id)
-    title = f"{ctx['year']}年{ctx['month']}月 工资条"
-    net = ctx["calc"]["actual_take_home"]
-    html_lines = [
-        "<!doctype html>",
-        '<html lang="zh-CN">',
-        "<head>",
-        '  <meta charset="utf-8"/>',
-        f"  <title>{title}</title>",
-        "  <style>",
-        "    body{font-family:-apple-system,BlinkMacSystemFont,'Segoe UI',sans-serif;",
-        "    background:#f6f1ec;color:#2d2a26;padding:24px;}",
-        "    .card{max-width:720px;margin:0 auto;background:#fffdfb;",
-        "    border:1px solid #e5e0dc;border-radius:16px;padding:24px;}",
-        "    h1{font-size:20px;margin:0 0 8px;font-family:ui-serif, Georgia, serif;}",
-        "    .net{font-size:18px;margin:8px 0 16px;}",
-        "    .row{display:flex;justify-content:space-between;padding:8px 0;",
-        "    border-bottom:1px solid #f1ebe7;}",
-        "    .muted{color:#6b6560;font-size:13px;}",
-        "    .actions{display:flex;gap:8px;margin:16px 0;}",
-        "    .btn{display:inline-flex;align-items:center;justify-content:center;",
-        "    height:32px;padding:0 12px;box-sizing:border-box;",
-        "    border:1px solid #e5e0dc;border-radius:8px;",
-        "    background:#f5f3f1;color:#2d2a26;text-decoration:none;",
-        "    font-size:14px;line-height:1;}",
-        "    .btn:hover{background:#eee7e2;}",
-        "    @media print{.actions{display:none;}}",
-        "  </style>",
-        "</head>",
-        "<body>",
-        '  <div class="card">',
-        f"    <h1>{title}</h1>",
-        f"    <div class=\"net\">实发：¥ {net:.2f}</div>",
-        "    <div class=\"row\"><span>基本工资</span>"
-        f"<span>¥ {ctx['base_salary']:.2f}</span></div>",
-        "    <div class=\"row\"><span>绩效工资</span>"
-        f"<span>¥ {ctx['performance_salary']:.2f}</span></div>",
-        "    <div class=\"row\"><span>养老保险</span>"
-        f"<span>¥ {ctx['pension_insurance']:.2f}</span></div>",
-        "    <div class=\"row\"><span>医疗保险</span>"
-        f"<span>¥ {ctx['medical_insurance']:.2f}</span></div>",
-        "    <div class=\"row\"><span>失业保险</span>"
-        f"<span>¥ {ctx['unemployment_insurance']:.2f}</span></div>",
-        "    <div class=\"row\"><span>大病保险</span>"
-        f"<span>¥ {ctx['critical_illness_insurance']:.2f}</span></div>",
-        "    <div class=\"row\"><span>企业年金</span>"
-        f"<span>¥ {ctx['enterprise_annuity']:.2f}</span></div>",
-        "    <div class=\"row\"><span>公积金</span>"
-        f"<span>¥ {ctx['housing_fund']:.2f}</span></div>",
-        "    <div class=\"row\"><span>个税</span>"
-        f"<span>¥ {ctx['tax']:.2f}</span></div>",
-        f"    <div class=\"muted\">备注：{ctx['note']}</div>",
-        "    <div class=\"actions\">",
-        "      <button class=\"btn\" onclick=\"window.print()\">"
-        "打印/保存为PDF</button>",
-        (
-            "      <a class=\"btn\" id=\"payslip-svg-link\" "
-            f"href=\"/api/salaries/{rec.id}/payslip.svg\" download>"
-        ),
-        "        下载图片(SVG)</a>",
-        "    </div>",
-        "  </div>",
-        "</body>",
-        "</html>",
-    ]
-    html = "\n".join(html_lines)
+    html = _PAYSLIP_HTML_TEMPLATE.format_map(_payslip_fields(ctx, rec["id"]))
     return HTMLResponse(html)
 
 
@@ -579,25 +833,34 @@ async def payslip_html(record_id: int, user=Depends(get_current_user)):
 async def update_salary(
     record_id: int, payload: SalaryUpdate, user=Depends(get_current_user)
 ):
-    rec = await SalaryRecord.filter(id=record_id, person__user_id=user.id).first()
+    rec = (
+        await SalaryRecord.filter(id=record_id, person__user_id=user.id)
+        .first()
+        .values(*_SALARY_OUT_FIELDS)
+    )
     if not rec:
         raise HTTPException(status_code=404, detail="记录不存在")
 
     # Update fixed fields
     update_data = payload.model_dump(exclude_unset=True, exclude={"custom_fields"})
+    update_data["updated_at"] = timezone.now()
+    await SalaryRecord.filter(id=record_id).update(**update_data)
+    # Mirror the UPDATE in the loaded row, coercing through each field so
+    # amounts stay Decimal like a freshly loaded record.
+    fields_map = SalaryRecord._meta.fields_map
     for field, value in update_data.items():
-        setattr(rec, field, value)
-    await rec.save()
+        rec[field] = fields_map[field].to_python_value(value)
 
     # Update custom fields if provided
     if payload.custom_fields is not None:
-        await save_custom_fields(rec.id, user.id, payload.custom_fields)
+        await save_custom_fields(record_id, user.id, payload.custom_fields)
+    invalidate_user_stats(user.id)
 
-    custom_data_map, custom_payroll_map = await load_custom_fields([rec.id])
+    custom_data_map, custom_payroll_map = await load_custom_fields([rec["id"]])
     return build_salary_out(
         rec,
-        custom_data_map.get(rec.id, {}),
-        custom_payroll_map.get(rec.id, []),
+        custom_data_map.get(rec["id"], {}),
+        custom_payroll_map.get(rec["id"], []),
     )
 
 
@@ -611,4 +874,5 @@ async def delete_salary(record_id: int, user=Depends(get_current_user)):
     await CustomSalaryValue.filter(salary_record_id=rec.id).delete()
 
     await rec.delete()
+    invalidate_user_stats(user.id)
     return {"ok": True}
@@ -13,6 +13,8 @@ from ..schemas.salary_field import (
     SalaryFieldOut,
     CategoryOut,
 )
+from ..services.salary_fields import invalidate_user_field_map
+from ..services.stats_cache import invalidate_user_stats
 from ..utils.auth import get_current_user
 
 
@@ -89,6 +91,8 @@ async def create_salary_field(
         is_non_cash=payload.is_non_cash,
         display_order=payload.display_order,
     )
+    invalidate_user_field_map(user.id)
+    invalidate_user_stats(user.id)
     return SalaryFieldOut(
         id=f.id,
         name=f.name,
@@ -129,6 +133,8 @@ async def update_salary_field(
         f.is_active = payload.is_active
 
     await f.save()
+    invalidate_user_field_map(user.id)
+    invalidate_user_stats(user.id)
     return SalaryFieldOut(
         id=f.id,
         name=f.name,
@@ -151,4 +157,6 @@ async def delete_salary_field(field_id: int, user=Depends(get_current_user)):
 
     f.is_active = False
     await f.save()
+    invalidate_user_field_map(user.id)
+    invalidate_user_stats(user.id)
     return {"ok": True}
@@ -1,4 +1,5 @@
 from fastapi import APIRouter, Depends, HTTPException
+from tortoise import timezone
 
 from ..models import Person, SalaryTemplate
 from ..schemas.salary_template import SalaryTemplateUpsert, SalaryTemplateOut
@@ -59,18 +60,13 @@ async def upsert_template(
 
     tmpl = await SalaryTemplate.filter(person_id=person_id).first()
     if tmpl:
-        tmpl.base_salary = payload.base_salary
-        tmpl.performance_salary = payload.performance_salary
-        tmpl.pension_insurance = payload.pension_insurance
-        tmpl.medical_insurance = payload.medical_insurance
-        tmpl.unemployment_insurance = payload.unemployment_insurance
-        tmpl.critical_illness_insurance = payload.critical_illness_insurance
-        tmpl.enterprise_annuity = payload.enterprise_annuity
-        tmpl.housing_fund = payload.housing_fund
-        tmpl.tax = payload.tax
-        tmpl.note = payload.note
-        tmpl.custom_fields = payload.custom_fields or {}
-        await tmpl.save()
+        update_data = payload.model_dump()
+        update_data["custom_fields"] = payload.custom_fields or {}
+        update_data["updated_at"] = timezone.now()
+        await SalaryTemplate.filter(id=tmpl.id).update(**update_data)
+        fields_map = tmpl._meta.fields_map
+        for field, value in update_data.items():
+            setattr(tmpl, field, fields_map[field].to_python_value(value))
     else:
         tmpl = await SalaryTemplate.create(
             person_id=person_id,
@@ -1,8 +1,15 @@
-from typing import List, Optional, Dict
+from functools import lru_cache
+from collections import defaultdict
+from typing import DefaultDict, List, Optional, Dict
 from fastapi import APIRouter, Query, Depends
-from decimal import Decimal
+from fastapi.responses import ORJSONResponse, Response, StreamingResponse
+import re
+import numpy as np
+from tortoise.expressions import Q, RawSQL, Subquery
+from tortoise.functions import Count, Sum
 
 from ..models import (
+    Person,
     SalaryRecord,
     CustomSalaryValue,
 )
@@ -10,112 +17,176 @@ from ..schemas.stats import (
     MonthlyStats,
     IncomeComposition,
     DeductionsBreakdown,
-    DeductionsMonthly,
-    DeductionsBreakdownItem,
+)
+from ..services.payroll import PAYROLL_FIXED_FIELDS, custom_field_sums_flat
+from ..services.stats_cache import (
+    STATS_CACHE_MAX_BODY_BYTES,
+    get_cached_stats,
+    set_cached_stats,
+    stats_cache_key,
 )
 from ..utils.auth import get_current_user
+from ..utils.streaming import json_array_stream
 
 
 router = APIRouter()
 
+# Columns the stats endpoints read from SalaryRecord; note and timestamps are
+# never used, so leave them out of the SELECT.
+SALARY_STAT_FIELDS = (
+    "id",
+    "person_id",
+    "year",
+    "month",
+    "base_salary",
+    "performance_salary",
+    "pension_insurance",
+    "medical_insurance",
+    "unemployment_insurance",
+    "critical_illness_insurance",
+    "enterprise_annuity",
+    "housing_fund",
+    "tax",
+)
+
 
 # Helpers for stats calculations aligned with the unified calculation spec
-def _D(v):
-    return v if isinstance(v, Decimal) else Decimal(str(v or 0))
+def _C(v) -> int:
+    """Amount as integer cents; stored amounts have two decimal places."""
+    return int(round(float(v or 0) * 100))
+
+
+# Columns declared on SalaryRecord. The legacy allowance/benefit/deduction
+# names are not among them; those amounts now live in custom fields.
+_RECORD_FIELDS = frozenset(SalaryRecord._meta.fields_map)
 
-# Safe field accessor - handles both direct fields and missing custom fields
-def _F(record, field_name, default=0):
-    """Safely get a field value from record, returns default if missing."""
-    try:
-        return getattr(record, field_name, default)
-    except AttributeError:
-        return default
+
+class CustomEntry:
+    """One custom field value of a salary record, as the stats endpoints use it."""
+
+    __slots__ = ("field_type", "is_non_cash", "amount", "field_key", "label")
+
+    def __init__(self, field_type, is_non_cash, amount, field_key, label):
+        self.field_type = field_type
+        self.is_non_cash = is_non_cash
+        self.amount = amount
+        self.field_key = field_key
+        self.label = label
 
 
 async def load_custom_fields_for_payroll(
-    record_ids: List[int],
-) -> Dict[int, List[dict]]:
-    """Batch load custom field info for payroll calculation."""
-    if not record_ids:
-        return {}
-    values = await CustomSalaryValue.filter(
-        salary_record_id__in=record_ids
-    ).prefetch_related("salary_field").all()
-    payroll_map: Dict[int, List[dict]] = {}
-    for v in values:
-        payroll_map.setdefault(v.salary_record_id, []).append(
-            {
-                "field_type": v.salary_field.field_type,
-                "is_non_cash": v.salary_field.is_non_cash,
-                "amount": float(v.amount),
-                "field_key": v.salary_field.field_key,
-                "label": v.salary_field.name,
-            }
+    records_q,
+) -> Dict[int, List[CustomEntry]]:
+    """Batch load custom field info for the records matched by ``records_q``.
+
+    The record ids are selected by a subquery rather than bound one by one,
+    so the statement size does not grow with the number of records.
+    """
+    rows = await CustomSalaryValue.filter(
+        salary_record_id__in=Subquery(records_q.values("id"))
+    ).values_list(
+        "salary_record_id",
+        "salary_field__field_type",
+        "salary_field__is_non_cash",
+        "amount",
+        "salary_field__field_key",
+        "salary_field__name",
+    )
+    payroll_map: DefaultDict[int, List[CustomEntry]] = defaultdict(list)
+    for record_id, field_type, is_non_cash, amount, field_key, label in rows:
+        payroll_map[record_id].append(
+            CustomEntry(field_type, is_non_cash, float(amount), field_key, label)
         )
     return payroll_map
 
 
-# Allowances for composition/gross (include meal allowance)
-
-def _allowances_sum_full(r: SalaryRecord) -> Decimal:
-    return (
-        _D(_F(r, "high_temp_allowance"))
-        + _D(_F(r, "low_temp_allowance"))
-        + _D(_F(r, "meal_allowance"))
-        + _D(_F(r, "computer_allowance"))
-        + _D(_F(r, "communication_allowance"))
-        + _D(_F(r, "comprehensive_allowance"))
+def _custom_sums(entries_list: List[List[CustomEntry]]):
+    """``(cash_income, non_cash_income, deductions)`` arrays, one per record."""
+    flat = [cf for entries in entries_list for cf in entries]
+    rows = np.repeat(np.arange(len(entries_list)), [len(e) for e in entries_list])
+    return custom_field_sums_flat(
+        len(entries_list),
+        rows,
+        np.fromiter((cf.amount for cf in flat), np.float64, len(flat)),
+        np.fromiter((cf.field_type == "income" for cf in flat), bool, len(flat)),
+        np.fromiter((cf.field_type == "deduction" for cf in flat), bool, len(flat)),
+        np.fromiter((cf.is_non_cash for cf in flat), bool, len(flat)),
     )
 
-# Benefits grouping (festival welfare only; excludes meal allowance)
-def _benefits_sum(r: SalaryRecord) -> Decimal:
-    return (
-        _D(_F(r, "mid_autumn_benefit"))
-        + _D(_F(r, "dragon_boat_benefit"))
-        + _D(_F(r, "spring_festival_benefit"))
-    )
 
-def _deductions_sum(r: SalaryRecord) -> Decimal:
-    return (
-        _D(r.pension_insurance)
-        + _D(r.medical_insurance)
-        + _D(r.unemployment_insurance)
-        + _D(r.critical_illness_insurance)
-        + _D(r.enterprise_annuity)
-        + _D(r.housing_fund)
-        + _D(_F(r, "other_deductions"))
-        + _D(_F(r, "labor_union_fee"))
-        + _D(_F(r, "performance_deduction"))
+# Legacy income columns grouped the way income composition reports them
+_ALLOWANCE_FIELDS = (
+    "high_temp_allowance",
+    "low_temp_allowance",
+    "meal_allowance",
+    "computer_allowance",
+    "communication_allowance",
+    "comprehensive_allowance",
+)
+_BENEFIT_FIELDS = (
+    "mid_autumn_benefit",
+    "dragon_boat_benefit",
+    "spring_festival_benefit",
+)
+
+
+# Income columns income composition reads, limited to those on SalaryRecord
+_COMPOSITION_COLUMNS = tuple(
+    f
+    for f in (
+        "base_salary",
+        "performance_salary",
+        "other_income",
+        *_ALLOWANCE_FIELDS,
+        *_BENEFIT_FIELDS,
     )
+    if f in _RECORD_FIELDS
+)
 
 
-def _custom_sums(custom_items: List[dict]) -> (Decimal, Decimal, Decimal):
-    custom_cash = Decimal("0")
-    custom_non_cash = Decimal("0")
-    custom_deduction = Decimal("0")
-    for cf in custom_items or []:
-        amount = _D(cf.get("amount", 0))
-        field_type = cf.get("field_type")
-        if field_type == "income":
-            if cf.get("is_non_cash"):
-                custom_non_cash += amount
-            else:
-                custom_cash += amount
-        elif field_type == "deduction":
-            custom_deduction += amount
-    return custom_cash, custom_non_cash, custom_deduction
+def _cents_column(columns: Dict[str, tuple], field_name: str, n: int) -> np.ndarray:
+    """One fetched column as an int64 array of cents (zeros if not fetched)."""
+    values = columns.get(field_name)
+    if values is None:
+        return np.zeros(n, dtype=np.int64)
+    floats = np.fromiter((float(v or 0) for v in values), np.float64, n)
+    return np.rint(floats * 100).astype(np.int64)
 
 
-def _ordered_categories(categories, totals):
-    ordered_keys = [k for k, _ in categories if k in totals]
-    extras = sorted(k for k in totals.keys() if k not in ordered_keys)
-    return ordered_keys + extras
+def _percents(parts: np.ndarray, total: np.ndarray) -> np.ndarray:
+    """``parts / total * 100`` for a (K, N) stack of parts in one pass.
+
+    Columns whose total is not positive come out as 0.0.
+    """
+    out = np.zeros_like(parts)
+    np.divide(parts, total, out=out, where=total > 0)
+    out *= 100
+    return out
+
+
+# Deduction breakdown categories in display order
+_DEDUCTION_CATEGORIES = (
+    ("养老保险", "pension_insurance"),
+    ("医疗保险", "medical_insurance"),
+    ("失业保险", "unemployment_insurance"),
+    ("大病互助保险", "critical_illness_insurance"),
+    ("企业年金", "enterprise_annuity"),
+    ("住房公积金", "housing_fund"),
+    ("其他扣除", "other_deductions"),
+    ("工会", "labor_union_fee"),
+    ("绩效扣除", "performance_deduction"),
+)
+_DEDUCTION_KEYS = tuple(key for _, key in _DEDUCTION_CATEGORIES)
+# Legacy categories have no column on SalaryRecord and always sum to zero
+_DEDUCTION_COLUMNS = tuple(key for key in _DEDUCTION_KEYS if key in _RECORD_FIELDS)
 
 
-def _ym_num(y: int, m: int) -> int:
-    return y * 100 + m
+# Range bounds are 'YYYY' or 'YYYY-MM', joined by one of the separators.
+_RANGE_SEP_RE = re.compile(r"\.\.|[:,_]")
+_RANGE_BOUND_RE = re.compile(r"(\d{4})|(\d+)\s*-\s*(\d+)")
 
 
+@lru_cache(maxsize=256)
 def _parse_range(range_str: str) -> (int, int):
     """Parse a flexible range string into start/end numeric YYYYMM bounds (inclusive).
     Accepted formats:
@@ -128,47 +199,92 @@ def _parse_range(range_str: str) -> (int, int):
         return (0, 999999)
 
     def parse_one(part: str, is_start: bool) -> (int, int):
-        p = part.strip()
-        if not p:
+        match = _RANGE_BOUND_RE.fullmatch(part.strip())
+        if not match:
             return (0, 1) if is_start else (9999, 12)
-        if len(p) == 4 and p.isdigit():
-            y = int(p)
+        year, y_str, m_str = match.groups()
+        if year:
+            y = int(year)
             return (y, 1) if is_start else (y, 12)
-        # Expect YYYY-MM
-        if "-" in p:
-            try:
-                y_str, m_str = p.split("-", 1)
-                y = int(y_str)
-                m = int(m_str)
-                return (y, m)
-            except Exception:
-                pass
-        # Fallback
-        return (0, 1) if is_start else (9999, 12)
-
-    sep = None
-    for candidate in ("..", ":", ",", "_"):
-        if candidate in s:
-            sep = candidate
-            break
+        return (int(y_str), int(m_str))
+
+    sep = _RANGE_SEP_RE.search(s)
     if not sep:
         y, m = parse_one(s, True)
-        return (_ym_num(y, m), _ym_num(y, m))
+        return (y * 100 + m, y * 100 + m)
 
-    left, right = s.split(sep, 1)
-    y1, m1 = parse_one(left, True)
-    y2, m2 = parse_one(right, False)
-    return (_ym_num(y1, m1), _ym_num(y2, m2))
+    y1, m1 = parse_one(s[: sep.start()], True)
+    y2, m2 = parse_one(s[sep.end() :], False)
+    return (y1 * 100 + m1, y2 * 100 + m2)
 
 
-def _apply_range(
-    recs: List[SalaryRecord],
-    range_str: Optional[str],
-) -> List[SalaryRecord]:
+def _apply_range(q, range_str: Optional[str]):
+    """Restrict a SalaryRecord queryset to the YYYYMM bounds of ``range_str``.
+
+    Months are always 1..12, so ``year * 100 + month`` between the bounds is
+    the same as comparing (year, month) pairs, which the database can match
+    on the (person_id, year, month) index.
+    """
     if not range_str:
-        return recs
+        return q
     start_num, end_num = _parse_range(range_str)
-    return [r for r in recs if start_num <= _ym_num(r.year, r.month) <= end_num]
+    start_y, start_m = divmod(start_num, 100)
+    end_y, end_m = divmod(end_num, 100)
+    return q.filter(
+        Q(year__gt=start_y) | Q(year=start_y, month__gte=start_m),
+        Q(year__lt=end_y) | Q(year=end_y, month__lte=end_m),
+    )
+
+
+# MAX over updated_at as text in one canonical 'YYYY-MM-DD HH:MM:SS' layout
+_LAST_UPDATE = RawSQL("""MAX(REPLACE("updated_at", 'T', ' '))""")
+
+
+async def _cache_stream(cache_key, tag, chunks):
+    """Pass ``chunks`` through, caching the body if it stays small enough.
+
+    Buffering stops as soon as the body exceeds STATS_CACHE_MAX_BODY_BYTES,
+    so large responses keep streaming in bounded memory and are not cached.
+    """
+    parts = []
+    size = 0
+    async for chunk in chunks:
+        if parts is not None:
+            size += len(chunk)
+            if size > STATS_CACHE_MAX_BODY_BYTES:
+                parts = None
+            else:
+                parts.append(chunk)
+        yield chunk
+    if parts is not None:
+        set_cached_stats(cache_key, tag, b"".join(parts))
+
+
+def _field_defs(user_id: int) -> RawSQL:
+    """The user's field definitions that affect totals, as one string."""
+    return RawSQL(
+        "(SELECT GROUP_CONCAT(d, ',') FROM (SELECT id || ':' || field_type"
+        " || ':' || is_non_cash || ':' || is_active AS d FROM salary_fields"
+        f" WHERE user_id = {int(user_id)} ORDER BY id))"
+    )
+
+
+async def _data_tag(user_id: int, q) -> tuple:
+    """Row count and latest update of the records behind a stats response,
+    plus the user's salary field definitions.
+
+    Inserts, deletes and record updates from any worker change the tag, as
+    do field type, non-cash and activation changes. updated_at is compared
+    with 'T' normalised to ' ', so rows written by older imports in ISO 'T'
+    form cannot outrank later edits.
+    """
+    row = await (
+        SalaryRecord.filter(id__in=Subquery(q.values("id")))
+        .annotate(count=Count("id"), last=_LAST_UPDATE, fields=_field_defs(user_id))
+        .first()
+        .values("count", "last", "fields")
+    )
+    return (row["count"], row["last"], row["fields"])
 
 
 def _salary_query(
@@ -177,41 +293,18 @@ def _salary_query(
     year: Optional[int] = None,
     month: Optional[int] = None,
 ):
-    q = SalaryRecord.filter(person__user_id=user_id)
+    # Restrict to the user's people with an IN subquery instead of joining
+    # persons into every stats query.
+    q = SalaryRecord.filter(
+        person_id__in=Subquery(Person.filter(user_id=user_id).values("id"))
+    )
     if person_id:
         q = q.filter(person_id=person_id)
     if year:
         q = q.filter(year=year)
     if month:
         q = q.filter(month=month)
-    return q
-
-
-def _payroll_args(r: SalaryRecord, custom_fields: Optional[List[dict]]):
-    return dict(
-        base_salary=r.base_salary,
-        performance_salary=r.performance_salary,
-        high_temp_allowance=_F(r, "high_temp_allowance"),
-        low_temp_allowance=_F(r, "low_temp_allowance"),
-        computer_allowance=_F(r, "computer_allowance"),
-        meal_allowance=_F(r, "meal_allowance"),
-        mid_autumn_benefit=_F(r, "mid_autumn_benefit"),
-        dragon_boat_benefit=_F(r, "dragon_boat_benefit"),
-        spring_festival_benefit=_F(r, "spring_festival_benefit"),
-        other_income=_F(r, "other_income"),
-        comprehensive_allowance=_F(r, "comprehensive_allowance"),
-        pension_insurance=r.pension_insurance,
-        medical_insurance=r.medical_insurance,
-        unemployment_insurance=r.unemployment_insurance,
-        critical_illness_insurance=r.critical_illness_insurance,
-        enterprise_annuity=r.enterprise_annuity,
-        housing_fund=r.housing_fund,
-        other_deductions=_F(r, "other_deductions"),
-        labor_union_fee=_F(r, "labor_union_fee"),
-        performance_deduction=_F(r, "performance_deduction"),
-        tax=r.tax,
-        custom_fields=custom_fields or [],
-    )
+    return q.order_by("year", "month", "person_id").only(*SALARY_STAT_FIELDS)
 
 
 @router.get("/monthly", response_model=List[MonthlyStats])
@@ -222,58 +315,77 @@ async def monthly_stats(
     month: Optional[int] = Query(default=None),
 ):
     q = _salary_query(user.id, person_id=person_id, year=year, month=month)
-    recs = await q.all()
-    custom_payroll_map = await load_custom_fields_for_payroll([r.id for r in recs])
-    result: List[MonthlyStats] = []
-    for r in recs:
-        custom_cash, custom_non_cash, custom_deduction = _custom_sums(
-            custom_payroll_map.get(r.id, [])
-        )
-        allowances_total = (
-            _F(r, "high_temp_allowance")
-            + _F(r, "low_temp_allowance")
-            + _F(r, "computer_allowance")
-            + _F(r, "communication_allowance")
-            + _F(r, "comprehensive_allowance")
-        )
-        insurance_total = (
-            r.pension_insurance
-            + r.medical_insurance
-            + r.unemployment_insurance
-            + r.critical_illness_insurance
-            + r.enterprise_annuity
-            + r.housing_fund
-        )
-        benefits_total = _benefits_sum(r) + custom_non_cash
-        cash_income = (
-            _D(r.base_salary)
-            + _D(r.performance_salary)
-            + _allowances_sum_full(r)
-            + _D(_F(r, "other_income"))
-            + custom_cash
-        )
-        deductions_total = (
-            _deductions_sum(r) + custom_deduction
+    cache_key = stats_cache_key(user.id, "monthly", person_id, year, month)
+    tag = await _data_tag(user.id, q)
+    body = get_cached_stats(cache_key, tag)
+    if body is not None:
+        return Response(body, media_type="application/json")
+
+    rows = await q.values_list(
+        "id", "person_id", "year", "month", *PAYROLL_FIXED_FIELDS
+    )
+    custom_payroll_map = await load_custom_fields_for_payroll(q)
+
+    # Columnar pass: the amounts become an (N, 9) float matrix ordered like
+    # PAYROLL_FIXED_FIELDS and every total is a vector sum over it. Legacy
+    # allowance/benefit/deduction names have no column and contribute 0.
+    fixed = (
+        np.array([r[4:] for r in rows], dtype=object)
+        .astype(np.float64)
+        .reshape(len(rows), len(PAYROLL_FIXED_FIELDS))
+    )
+    custom_cash, custom_non_cash, custom_deduction = _custom_sums(
+        [custom_payroll_map.get(r[0], []) for r in rows]
+    )
+    insurance_total = fixed[:, 2:8].sum(axis=1)
+    cash_income = fixed[:, 0] + fixed[:, 1] + custom_cash
+    actual_take_home = cash_income - insurance_total - custom_deduction - fixed[:, 8]
+
+    # Amounts are whole cents, so rounding to 2 places matches the exact
+    # Decimal sums converted to float. tolist() yields plain floats for orjson.
+    insurance_total = insurance_total.round(2).tolist()
+    cash_income = cash_income.round(2).tolist()
+    actual_take_home = actual_take_home.round(2).tolist()
+    benefits_total = custom_non_cash.round(2).tolist()
+    base_salary = fixed[:, 0].tolist()
+    performance = fixed[:, 1].tolist()
+    tax = fixed[:, 8].tolist()
+
+    # Every value is already a float/int of the MonthlyStats shape, so skip
+    # pydantic validation and stream plain dicts from one generator
+    # expression, walking the column lists in lockstep instead of indexing.
+    monthly_rows = (
+        dict(
+            person_id=r[1],
+            year=r[2],
+            month=r[3],
+            base_salary=base,
+            performance=perf,
+            allowances_total=0.0,
+            bonuses_total=0.0,
+            insurance_total=ins,
+            tax=tx,
+            gross_income=gross,
+            net_income=take_home,
+            actual_take_home=take_home,
+            non_cash_benefits=benefits,
         )
-        actual_take_home = cash_income - deductions_total - _D(r.tax)
-        result.append(
-            MonthlyStats(
-                person_id=r.person_id,
-                year=r.year,
-                month=r.month,
-                base_salary=r.base_salary,
-                performance=r.performance_salary,
-                allowances_total=allowances_total,
-                bonuses_total=0.0,
-                insurance_total=insurance_total,
-                tax=float(_D(r.tax)),
-                gross_income=float(cash_income),
-                net_income=float(actual_take_home),
-                actual_take_home=float(actual_take_home),
-                non_cash_benefits=float(benefits_total),
-            )
+        for r, base, perf, ins, tx, gross, take_home, benefits in zip(
+            rows,
+            base_salary,
+            performance,
+            insurance_total,
+            tax,
+            cash_income,
+            actual_take_home,
+            benefits_total,
         )
-    return result
+    )
+
+    return StreamingResponse(
+        _cache_stream(cache_key, tag, json_array_stream(monthly_rows)),
+        media_type="application/json",
+    )
 
 
 @router.get("/income-composition", response_model=List[IncomeComposition])
@@ -290,123 +402,123 @@ async def income_composition(
     补贴 = 高温补贴 + 低温补贴 + 餐补 + 电脑补贴
     福利 = 中秋福利 + 端午福利 + 春节福利
     """
-    q = _salary_query(user.id, person_id=person_id, year=year, month=month)
-    recs = _apply_range(await q.all(), range)
-    custom_payroll_map = await load_custom_fields_for_payroll([r.id for r in recs])
-
-    result: List[IncomeComposition] = []
-
-    for r in recs:
-        custom_income = Decimal("0")
-        custom_non_cash = Decimal("0")
-        custom_cash = Decimal("0")
-        custom_items = []
-        custom_non_cash_items = []
-        for cf in custom_payroll_map.get(r.id, []):
-            amount = _D(cf.get("amount", 0))
-            if cf.get("field_type") != "income":
-                continue
-            custom_income += amount
-            if cf.get("is_non_cash"):
-                custom_non_cash += amount
-                if amount != 0:
+    q = _apply_range(
+        _salary_query(user.id, person_id=person_id, year=year, month=month), range
+    )
+    cache_key = stats_cache_key(user.id, "composition", person_id, year, month, range)
+    tag = await _data_tag(user.id, q)
+    body = get_cached_stats(cache_key, tag)
+    if body is not None:
+        return Response(body, media_type="application/json")
+
+    # Plain (id, person_id, year, month, *amounts) tuples; the amounts are
+    # then regrouped by column.
+    rows = await q.values_list(
+        "id", "person_id", "year", "month", *_COMPOSITION_COLUMNS
+    )
+    n = len(rows)
+    columns = dict(zip(_COMPOSITION_COLUMNS, list(zip(*rows))[4:]))
+    custom_payroll_map = await load_custom_fields_for_payroll(q)
+
+    # Totals are int64 cents per record, converted to float only for output.
+    # Legacy allowance/benefit columns are not on the model and add 0.
+    custom_cash, custom_non_cash, _ = _custom_sums(
+        [custom_payroll_map.get(r[0], []) for r in rows]
+    )
+    custom_cash_c = np.rint(custom_cash * 100).astype(np.int64)
+    custom_non_cash_c = np.rint(custom_non_cash * 100).astype(np.int64)
+    base_salary_c = _cents_column(columns, "base_salary", n)
+    performance_c = _cents_column(columns, "performance_salary", n)
+    # Read each legacy column once; the arrays feed both the group totals
+    # and the per-field values in the response.
+    legacy_c = {
+        f: _cents_column(columns, f, n) for f in (*_ALLOWANCE_FIELDS, *_BENEFIT_FIELDS)
+    }
+    allowances_c = sum(legacy_c[f] for f in _ALLOWANCE_FIELDS)
+    other_income_base_c = _cents_column(columns, "other_income", n)
+    benefits_c = sum((legacy_c[f] for f in _BENEFIT_FIELDS), custom_non_cash_c)
+    other_income_c = other_income_base_c + custom_cash_c
+    total_c = (
+        base_salary_c + performance_c + allowances_c + benefits_c + other_income_c
+    )
+
+    # One (5, N) stack of the composition parts, so the float conversion
+    # and the percentage division each run as a single vector operation.
+    parts = (
+        np.stack(
+            [base_salary_c, performance_c, allowances_c, benefits_c, other_income_c]
+        )
+        / 100
+    )
+    total_income = total_c / 100
+    (
+        base_salary_percent,
+        performance_percent,
+        allowances_percent,
+        benefits_percent,
+        other_percent,
+    ) = _percents(parts, total_income).tolist()
+    base_salary, performance_salary, _, benefits, other_income = parts.tolist()
+    other_income_base = (other_income_base_c / 100).tolist()
+    legacy = {f: (c / 100).tolist() for f, c in legacy_c.items()}
+    total_income = total_income.tolist()
+
+    def composition_rows():
+        for i, r in enumerate(rows):
+            custom_items = []
+            custom_non_cash_items = []
+            for cf in custom_payroll_map.get(r[0], ()):
+                if cf.field_type != "income" or _C(cf.amount) == 0:
+                    continue
+                if cf.is_non_cash:
                     custom_non_cash_items.append(
                         {
-                            "key": cf.get("field_key") or "",
-                            "label": (
-                                cf.get("label")
-                                or cf.get("field_key")
-                                or "自定义福利"
-                            ),
-                            "amount": float(amount),
+                            "key": cf.field_key or "",
+                            "label": cf.label or cf.field_key or "自定义福利",
+                            "amount": cf.amount,
                         }
                     )
-            else:
-                custom_cash += amount
-                if amount != 0:
+                else:
                     custom_items.append(
                         {
-                            "key": cf.get("field_key") or "",
-                            "label": (
-                                cf.get("label")
-                                or cf.get("field_key")
-                                or "自定义收入"
-                            ),
-                            "amount": float(amount),
+                            "key": cf.field_key or "",
+                            "label": cf.label or cf.field_key or "自定义收入",
+                            "amount": cf.amount,
                         }
                     )
 
-        allowances = float(_allowances_sum_full(r))
-        base_other = _D(_F(r, "other_income"))
-        benefits = float(_benefits_sum(r) + custom_non_cash)
-        other_income = float(base_other + custom_cash)
-        total_income = float(
-            _D(r.base_salary)
-            + _D(r.performance_salary)
-            + _D(allowances)
-            + _D(benefits)
-            + _D(other_income)
-        )
-        
-        # Calculate percentages (avoid division by zero)
-        if total_income > 0:
-            base_salary_percent = float(
-                _D(r.base_salary) / _D(total_income) * 100
-            )
-            performance_percent = float(
-                _D(r.performance_salary) / _D(total_income) * 100
-            )
-            allowances_percent = float(
-                _D(allowances) / _D(total_income) * 100
-            )
-            benefits_percent = float(
-                _D(benefits) / _D(total_income) * 100
-            )
-            other_percent = float(_D(other_income) / _D(total_income) * 100)
-        else:
-            base_salary_percent = 0.0
-            performance_percent = 0.0
-            allowances_percent = 0.0
-            benefits_percent = 0.0
-            other_percent = 0.0
-        
-        result.append(
-            IncomeComposition(
-                person_id=r.person_id,
-                year=r.year,
-                month=r.month,
-                base_salary=float(_D(r.base_salary)),
-                performance_salary=float(_D(r.performance_salary)),
-                high_temp_allowance=float(_D(_F(r, "high_temp_allowance"))),
-                low_temp_allowance=float(_D(_F(r, "low_temp_allowance"))),
-                computer_allowance=float(_D(_F(r, "computer_allowance"))),
-                communication_allowance=float(
-                    _D(_F(r, "communication_allowance"))
-                ),
-                comprehensive_allowance=float(
-                    _D(_F(r, "comprehensive_allowance"))
-                ),
-                meal_allowance=float(_D(_F(r, "meal_allowance"))),
-                mid_autumn_benefit=float(_D(_F(r, "mid_autumn_benefit"))),
-                dragon_boat_benefit=float(_D(_F(r, "dragon_boat_benefit"))),
-                spring_festival_benefit=float(
-                    _D(_F(r, "spring_festival_benefit"))
-                ),
-                other_income=other_income,
-                other_income_base=float(base_other),
-                non_cash_benefits=float(_D(benefits)),
+            yield dict(
+                person_id=r[1],
+                year=r[2],
+                month=r[3],
+                base_salary=base_salary[i],
+                performance_salary=performance_salary[i],
+                high_temp_allowance=legacy["high_temp_allowance"][i],
+                low_temp_allowance=legacy["low_temp_allowance"][i],
+                computer_allowance=legacy["computer_allowance"][i],
+                communication_allowance=legacy["communication_allowance"][i],
+                comprehensive_allowance=legacy["comprehensive_allowance"][i],
+                meal_allowance=legacy["meal_allowance"][i],
+                mid_autumn_benefit=legacy["mid_autumn_benefit"][i],
+                dragon_boat_benefit=legacy["dragon_boat_benefit"][i],
+                spring_festival_benefit=legacy["spring_festival_benefit"][i],
+                other_income=other_income[i],
+                other_income_base=other_income_base[i],
+                non_cash_benefits=benefits[i],
                 custom_income_items=custom_items,
                 custom_non_cash_items=custom_non_cash_items,
-                total_income=total_income,
-                base_salary_percent=base_salary_percent,
-                performance_percent=performance_percent,
-                allowances_percent=allowances_percent,
-                benefits_percent=benefits_percent,
-                other_percent=other_percent,
+                total_income=total_income[i],
+                base_salary_percent=base_salary_percent[i],
+                performance_percent=performance_percent[i],
+                allowances_percent=allowances_percent[i],
+                benefits_percent=benefits_percent[i],
+                other_percent=other_percent[i],
             )
-        )
 
-    return result
+    return StreamingResponse(
+        _cache_stream(cache_key, tag, json_array_stream(composition_rows())),
+        media_type="application/json",
+    )
 
 
 @router.get("/deductions/breakdown", response_model=DeductionsBreakdown)
@@ -422,84 +534,78 @@ async def deductions_breakdown(
     """Breakdown of deduction categories with monthly series and percentage share.
     支持按人员、年份、月份过滤；为兼容性保留 range，但前端已不使用。
     """
-    q = _salary_query(user.id, person_id=person_id, year=year, month=month)
-    recs = _apply_range(await q.all(), range)
-    custom_payroll_map = await load_custom_fields_for_payroll([r.id for r in recs])
-
-    # Summary totals by category
-    categories = [
-        ("养老保险", "pension_insurance"),
-        ("医疗保险", "medical_insurance"),
-        ("失业保险", "unemployment_insurance"),
-        ("大病互助保险", "critical_illness_insurance"),
-        ("企业年金", "enterprise_annuity"),
-        ("住房公积金", "housing_fund"),
-        ("其他扣除", "other_deductions"),
-        ("工会", "labor_union_fee"),
-        ("绩效扣除", "performance_deduction"),
-    ]
-
-    totals = {key: Decimal("0") for _, key in categories}
-    for r in recs:
-        custom_deduction = Decimal("0")
-        for cf in custom_payroll_map.get(r.id, []):
-            if cf.get("field_type") == "deduction":
-                custom_deduction += _D(cf.get("amount", 0))
-        for _, key in categories:
-            if key == "other_deductions":
-                totals[key] += _D(_F(r, key)) + custom_deduction
-            else:
-                totals[key] += _D(_F(r, key))
-
-    grand_total = sum(totals.values()) if totals else Decimal("0")
-    summary: List[DeductionsBreakdownItem] = []
-    for name, key in categories:
-        amount = totals[key]
-        percent = float((amount / grand_total * 100) if grand_total > 0 else 0)
-        summary.append(
-            DeductionsBreakdownItem(
-                category=name, amount=float(amount), percent=percent
-            )
+    # Let the database sum per (year, month): one grouped query for the fixed
+    # columns and one for custom deduction values of the same records.
+    q = _apply_range(
+        _salary_query(user.id, person_id=person_id, year=year, month=month), range
+    )
+    cache_key = stats_cache_key(user.id, "deductions", person_id, year, month, range)
+    tag = await _data_tag(user.id, q)
+    body = get_cached_stats(cache_key, tag)
+    if body is not None:
+        return Response(body, media_type="application/json")
+
+    month_rows = await (
+        q.annotate(**{key: Sum(key) for key in _DEDUCTION_COLUMNS})
+        .group_by("year", "month")
+        .order_by("year", "month")
+        .values("year", "month", *_DEDUCTION_COLUMNS)
+    )
+    custom_rows = await (
+        CustomSalaryValue.filter(
+            salary_record_id__in=Subquery(q.values("id")),
+            salary_field__field_type="deduction",
         )
+        .annotate(total=Sum("amount"))
+        .group_by("salary_record__year", "salary_record__month")
+        .values("salary_record__year", "salary_record__month", "total")
+    )
+    custom_by_month = {
+        (row["salary_record__year"], row["salary_record__month"]): _C(row["total"])
+        for row in custom_rows
+    }
 
-    # Monthly series
     monthly_map = {}
-    for r in recs:
-        k = (r.year, r.month)
-        if k not in monthly_map:
-            monthly_map[k] = {key: Decimal("0") for _, key in categories}
-        custom_deduction = Decimal("0")
-        for cf in custom_payroll_map.get(r.id, []):
-            if cf.get("field_type") == "deduction":
-                custom_deduction += _D(cf.get("amount", 0))
-        for _, key in categories:
-            if key == "other_deductions":
-                monthly_map[k][key] += _D(_F(r, key)) + custom_deduction
-            else:
-                monthly_map[k][key] += _D(_F(r, key))
+    for row in month_rows:
+        k = (row["year"], row["month"])
+        data = {key: _C(row.get(key)) for key in _DEDUCTION_KEYS}
+        data["other_deductions"] += custom_by_month.get(k, 0)
+        monthly_map[k] = data
+
+    # Totals are integer cents; divide by 100 only for the response
+    totals = {
+        key: sum(data[key] for data in monthly_map.values()) for key in _DEDUCTION_KEYS
+    }
+
+    grand_total = sum(totals.values())
+    summary: List[dict] = []
+    for name, key in _DEDUCTION_CATEGORIES:
+        amount = totals[key]
+        percent = (amount / grand_total * 100) if grand_total > 0 else 0.0
+        summary.append(dict(category=name, amount=amount / 100, percent=percent))
 
-    monthly: List[DeductionsMonthly] = []
-    for (y, m) in sorted(monthly_map.keys()):
-        data = monthly_map[(y, m)]
+    # monthly_map was filled from rows already ordered by (year, month)
+    monthly: List[dict] = []
+    for (y, m), data in monthly_map.items():
         total = sum(data.values())
         monthly.append(
-            DeductionsMonthly(
+            dict(
                 year=y,
                 month=m,
-                pension_insurance=float(data["pension_insurance"]),
-                medical_insurance=float(data["medical_insurance"]),
-                unemployment_insurance=float(data["unemployment_insurance"]),
-                critical_illness_insurance=float(
-                    data["critical_illness_insurance"]
-                ),
-                enterprise_annuity=float(data["enterprise_annuity"]),
-                housing_fund=float(data["housing_fund"]),
-                other_deductions=float(data["other_deductions"]),
-                labor_union_fee=float(data["labor_union_fee"]),
-                performance_deduction=float(data["performance_deduction"]),
-                total=float(total),
+                pension_insurance=data["pension_insurance"] / 100,
+                medical_insurance=data["medical_insurance"] / 100,
+                unemployment_insurance=data["unemployment_insurance"] / 100,
+                critical_illness_insurance=data["critical_illness_insurance"] / 100,
+                enterprise_annuity=data["enterprise_annuity"] / 100,
+                housing_fund=data["housing_fund"] / 100,
+                other_deductions=data["other_deductions"] / 100,
+                labor_union_fee=data["labor_union_fee"] / 100,
+                performance_deduction=data["performance_deduction"] / 100,
+                total=total / 100,
             )
         )
 
-    return DeductionsBreakdown(summary=summary, monthly=monthly)
+    response = ORJSONResponse({"summary": summary, "monthly": monthly})
+    set_cached_stats(cache_key, tag, response.body)
+    return response
 
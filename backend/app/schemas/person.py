@@ -2,13 +2,15 @@ from pydantic import BaseModel, Field, field_validator
 from typing import Optional
 from decimal import Decimal, ROUND_HALF_UP
 
+_CENT = Decimal("0.01")
+
 
 def _q2(v: Optional[Decimal]) -> Optional[Decimal]:
     if v is None:
         return None
     if not isinstance(v, Decimal):
         v = Decimal(str(v))
-    return v.quantize(Decimal("0.01"), rounding=ROUND_HALF_UP)
+    return v.quantize(_CENT, rounding=ROUND_HALF_UP)
 
 
 class PersonCreate(BaseModel):
@@ -1,5 +1,23 @@
 from decimal import Decimal, ROUND_HALF_UP
 
+import numpy as np
+
+_DEC_ZERO = Decimal(0)
+_CENT = Decimal("0.01")
+
+# Column order of the fixed-field matrix accepted by compute_payroll_batch
+PAYROLL_FIXED_FIELDS = (
+    "base_salary",
+    "performance_salary",
+    "pension_insurance",
+    "medical_insurance",
+    "unemployment_insurance",
+    "critical_illness_insurance",
+    "enterprise_annuity",
+    "housing_fund",
+    "tax",
+)
+
 
 def compute_payroll(
     *,
@@ -31,7 +49,6 @@ def compute_payroll(
 ):
     def D(v):
         return v if isinstance(v, Decimal) else Decimal(str(v or 0))
-    q = Decimal("0.01")
 
     base_salary = D(base_salary)
     performance_salary = D(performance_salary)
@@ -45,10 +62,10 @@ def compute_payroll(
     tax = D(tax)
 
     # Process custom fields
-    custom_income = Decimal("0")
-    custom_deductions = Decimal("0")
-    custom_non_cash = Decimal("0")
-    custom_cash_income = Decimal("0")
+    custom_income = _DEC_ZERO
+    custom_deductions = _DEC_ZERO
+    custom_non_cash = _DEC_ZERO
+    custom_cash_income = _DEC_ZERO
 
     if custom_fields:
         for cf in custom_fields:
@@ -66,14 +83,14 @@ def compute_payroll(
                 custom_deductions += amount
 
     # Non-cash benefits (not included in actual take-home)
-    non_cash_benefits = custom_non_cash.quantize(q, rounding=ROUND_HALF_UP)
+    non_cash_benefits = custom_non_cash.quantize(_CENT, rounding=ROUND_HALF_UP)
 
     # Total income includes base + performance + custom income
     total_income = (
         base_salary
         + performance_salary
         + custom_income
-    ).quantize(q, rounding=ROUND_HALF_UP)
+    ).quantize(_CENT, rounding=ROUND_HALF_UP)
 
     # Total deductions (五险一金 + custom deductions)
     total_deductions = (
@@ -84,11 +101,11 @@ def compute_payroll(
         + enterprise_annuity
         + housing_fund
         + custom_deductions
-    ).quantize(q, rounding=ROUND_HALF_UP)
+    ).quantize(_CENT, rounding=ROUND_HALF_UP)
 
     gross_income = total_income
     net_income = (gross_income - total_deductions - tax).quantize(
-        q, rounding=ROUND_HALF_UP
+        _CENT, rounding=ROUND_HALF_UP
     )
 
     # Actual take-home = cash income - deductions - tax
@@ -99,14 +116,96 @@ def compute_payroll(
         + custom_cash_income
         - total_deductions
         - tax
-    ).quantize(q, rounding=ROUND_HALF_UP)
+    ).quantize(_CENT, rounding=ROUND_HALF_UP)
 
     return {
         "total_income": total_income,
         "total_deductions": total_deductions,
         "gross_income": gross_income,
-        "tax": tax.quantize(q, rounding=ROUND_HALF_UP),
+        "tax": tax.quantize(_CENT, rounding=ROUND_HALF_UP),
         "net_income": net_income,
         "actual_take_home": actual_take_home,
         "non_cash_benefits": non_cash_benefits,
     }
+
+
+def custom_field_sums_flat(n, rows, amounts, is_income, is_deduction, is_non_cash):
+    """Reduce flattened custom field values to per-record totals.
+
+    Every argument after ``n`` is a parallel array with one entry per custom
+    value; ``rows`` holds the owning record's index in ``range(n)``. Returns
+    ``(cash_income, non_cash_income, deductions)`` float64 arrays of length n.
+    """
+
+    def _per_record(mask):
+        weights = amounts * mask
+        return np.bincount(rows, weights=weights, minlength=n).astype(np.float64)
+
+    return (
+        _per_record(is_income & ~is_non_cash),
+        _per_record(is_income & is_non_cash),
+        _per_record(is_deduction),
+    )
+
+
+def custom_field_sums_batch(custom_fields_list):
+    """Per-record custom field totals for many records at once.
+
+    Returns ``(cash_income, non_cash_income, deductions)`` float64 arrays with
+    one entry per item of ``custom_fields_list``.
+    """
+    n = len(custom_fields_list)
+
+    # Flatten the ragged custom fields into CSR-style parallel arrays
+    # (owning row, amount, type flags) and reduce them with bincount.
+    flat = [cf for cfs in custom_fields_list for cf in cfs or ()]
+    rows = np.repeat(
+        np.arange(n), [len(cfs or ()) for cfs in custom_fields_list]
+    )
+    amounts = np.fromiter(
+        (float(cf.get("amount", 0) or 0) for cf in flat), np.float64, len(flat)
+    )
+    is_income = np.fromiter(
+        (cf.get("field_type", "income") == "income" for cf in flat), bool, len(flat)
+    )
+    is_deduction = np.fromiter(
+        (cf.get("field_type", "income") == "deduction" for cf in flat),
+        bool,
+        len(flat),
+    )
+    is_non_cash = np.fromiter(
+        (bool(cf.get("is_non_cash", False)) for cf in flat), bool, len(flat)
+    )
+    return custom_field_sums_flat(
+        n, rows, amounts, is_income, is_deduction, is_non_cash
+    )
+
+
+def compute_payroll_batch(fixed, custom_fields_list):
+    """Vectorised compute_payroll for many records at once.
+
+    ``fixed`` is an (N, 9) float array ordered like PAYROLL_FIXED_FIELDS and
+    ``custom_fields_list`` holds each record's custom field dicts. Returns the
+    same keys as compute_payroll, each as a float64 array of length N.
+    """
+    fixed = np.asarray(fixed, dtype=np.float64).reshape(
+        -1, len(PAYROLL_FIXED_FIELDS)
+    )
+    custom_cash, custom_non_cash, custom_deductions = custom_field_sums_batch(
+        custom_fields_list
+    )
+
+    cash_income = fixed[:, :2].sum(axis=1) + custom_cash
+    total_income = cash_income + custom_non_cash
+    total_deductions = fixed[:, 2:8].sum(axis=1) + custom_deductions
+    tax = fixed[:, 8]
+
+    return {
+        "total_income": total_income.round(2),
+        "total_deductions": total_deductions.round(2),
+        "gross_income": total_income.round(2),
+        "tax": tax.round(2),
+        "net_income": (total_income - total_deductions - tax).round(2),
+        "actual_take_home": (cash_income - total_deductions - tax).round(2),
+        "non_cash_benefits": custom_non_cash.round(2),
+    }
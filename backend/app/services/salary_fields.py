@@ -0,0 +1,69 @@
+import asyncio
+import time
+from typing import Dict, Tuple
+
+from ..models import SalaryField
+
+
+# Field definitions are configuration data that rarely change, so keep a
+# short-lived per-process copy for read paths. Write routes call
+# invalidate_user_field_map; the TTL bounds staleness across worker processes.
+FIELD_MAP_TTL_SECONDS = 60
+
+_cache: Dict[int, Tuple[float, Tuple[Dict[str, int], Dict[str, dict]]]] = {}
+# One lock per user, taken only on a miss so concurrent misses for the same
+# user share a single query while other users are never held up.
+_locks: Dict[int, asyncio.Lock] = {}
+
+
+def _cached(user_id: int):
+    cached = _cache.get(user_id)
+    if cached and cached[0] > time.monotonic():
+        return cached[1]
+    return None
+
+
+async def load_user_field_map(
+    user_id: int,
+) -> Tuple[Dict[str, int], Dict[str, dict]]:
+    """Query ``(field_id_by_key, meta_by_key)`` for the user's active fields.
+
+    Write paths use this directly: another worker's cached copy may still
+    miss a new field or include a deactivated one.
+    """
+    rows = await SalaryField.filter(user_id=user_id, is_active=True).values(
+        "id", "field_key", "field_type", "is_non_cash"
+    )
+    field_ids = {r["field_key"]: r["id"] for r in rows}
+    meta = {
+        r["field_key"]: {
+            "field_type": r["field_type"],
+            "is_non_cash": r["is_non_cash"],
+        }
+        for r in rows
+    }
+    return field_ids, meta
+
+
+async def get_user_field_map(
+    user_id: int,
+) -> Tuple[Dict[str, int], Dict[str, dict]]:
+    """Return the cached ``load_user_field_map`` result, for read paths."""
+    data = _cached(user_id)
+    if data is not None:
+        return data
+
+    async with _locks.setdefault(user_id, asyncio.Lock()):
+        # Another request may have filled the cache while we waited
+        data = _cached(user_id)
+        if data is not None:
+            return data
+
+        data = await load_user_field_map(user_id)
+        _cache[user_id] = (time.monotonic() + FIELD_MAP_TTL_SECONDS, data)
+        return data
+
+
+def invalidate_user_field_map(user_id: int) -> None:
+    """Drop the cached field map after the user's field definitions change."""
+    _cache.pop(user_id, None)
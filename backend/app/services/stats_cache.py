@@ -0,0 +1,50 @@
+import time
+from collections import OrderedDict
+from typing import Dict, Hashable, Optional, Tuple
+
+
+# Encoded stats responses are pure functions of the user's salary data and
+# the query parameters. Keep the most recent ones per process; entries carry
+# a data tag checked on every hit, write routes call invalidate_user_stats,
+# and the TTL bounds staleness across worker processes.
+STATS_CACHE_TTL_SECONDS = 60
+STATS_CACHE_MAX_ENTRIES = 1024
+# Larger bodies are streamed without being cached, so a cache miss never has
+# to hold more than this much of an encoded response.
+STATS_CACHE_MAX_BODY_BYTES = 256 * 1024
+
+_cache: "OrderedDict[Hashable, Tuple[float, Hashable, bytes]]" = OrderedDict()
+_generations: Dict[int, int] = {}
+
+
+def stats_cache_key(user_id: int, *params: Hashable) -> Tuple[Hashable, ...]:
+    """Build a cache key that changes whenever the user's stats are invalidated."""
+    return (user_id, _generations.get(user_id, 0), *params)
+
+
+def get_cached_stats(key: Hashable, tag: Hashable) -> Optional[bytes]:
+    """Return the cached body for ``key`` if it is fresh and matches ``tag``."""
+    entry = _cache.get(key)
+    if not entry:
+        return None
+    expires, cached_tag, body = entry
+    if expires <= time.monotonic() or cached_tag != tag:
+        del _cache[key]
+        return None
+    _cache.move_to_end(key)
+    return body
+
+
+def set_cached_stats(key: Hashable, tag: Hashable, body: bytes) -> None:
+    """Store an encoded response body, evicting the least recently used."""
+    if len(body) > STATS_CACHE_MAX_BODY_BYTES:
+        return
+    _cache[key] = (time.monotonic() + STATS_CACHE_TTL_SECONDS, tag, body)
+    _cache.move_to_end(key)
+    while len(_cache) > STATS_CACHE_MAX_ENTRIES:
+        _cache.popitem(last=False)
+
+
+def invalidate_user_stats(user_id: int) -> None:
+    """Make every cached stats response of the user unreachable."""
+    _generations[user_id] = _generations.get(user_id, 0) + 1
@@ -0,0 +1,19 @@
+import orjson
+
+
+# Streamed JSON responses are flushed to the client in chunks of about this size.
+STREAM_CHUNK_SIZE = 64 * 1024
+
+
+async def json_array_stream(rows):
+    """Encode an iterable of dicts as a JSON array, yielding ~64KB chunks."""
+    buf = bytearray(b"[")
+    for i, row in enumerate(rows):
+        if i:
+            buf += b","
+        buf += orjson.dumps(row)
+        if len(buf) >= STREAM_CHUNK_SIZE:
+            yield bytes(buf)
+            buf.clear()
+    buf += b"]"
+    yield bytes(buf)
@@ -1,4 +1,5 @@
 import os
+from functools import lru_cache
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 # If running from repo source (backend/), keep data at repo root.
@@ -9,7 +10,6 @@ ROOT_DIR = (
     else BASE_DIR
 )
 DATA_DIR = os.path.join(ROOT_DIR, "data")
-os.makedirs(DATA_DIR, exist_ok=True)
 DB_PATH = os.environ.get("DATABASE_PATH", os.path.join(DATA_DIR, "salarium.db"))
 
 JWT_SECRET = os.environ.get("JWT_SECRET", "super-secret-change-me")
@@ -17,3 +17,13 @@ JWT_ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 24
 
 CORS_ORIGINS = os.environ.get("CORS_ORIGINS", "*").split(",")
+
+
+@lru_cache(maxsize=1)
+def ensure_db_dir() -> str:
+    """Create the database directory once per process and return DB_PATH.
+
+    Kept out of import time so importing config has no filesystem effects.
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(DB_PATH)), exist_ok=True)
+    return DB_PATH
@@ -0,0 +1,34 @@
+import os
+import tempfile
+import uuid
+
+# The database path is read when config is imported, so point it at a
+# throwaway file before the app is loaded, overriding any configured one.
+os.environ["DATABASE_PATH"] = os.path.join(tempfile.mkdtemp(), "test.db")
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+from app.main import app  # noqa: E402
+
+
+def client() -> TestClient:
+    return TestClient(app)
+
+
+def login(c: TestClient) -> dict:
+    """Register a fresh user and return its auth headers."""
+    username = uuid.uuid4().hex[:12]
+    c.post("/api/auth/register", json={"username": username, "password": "p"})
+    token = c.post(
+        "/api/auth/login", json={"username": username, "password": "p"}
+    ).json()["access_token"]
+    return {"Authorization": f"Bearer {token}"}
+
+
+def import_csv(c: TestClient, headers: dict, body: str, **params):
+    return c.post(
+        "/api/salaries/import",
+        params=params,
+        files={"file": ("salaries.csv", body, "text/csv")},
+        headers=headers,
+    )
@@ -0,0 +1,83 @@
+import io
+import sqlite3
+import unittest
+
+from openpyxl import Workbook
+
+from tests.helpers import client, import_csv, login
+
+from config import DB_PATH
+
+
+class ImportTimestampTest(unittest.TestCase):
+    def test_import_update_stores_updated_at_like_other_writes(self):
+        with client() as c:
+            h = login(c)
+            pid = c.post("/api/persons/", json={"name": "A"}, headers=h).json()["id"]
+            rec = c.post(
+                f"/api/salaries/{pid}", json={"year": 2024, "month": 1}, headers=h
+            ).json()
+            resp = import_csv(
+                c, h, f"person_id,year,month,base_salary\n{pid},2024,1,5\n"
+            )
+            self.assertEqual(resp.json()["updated"], 1)
+
+            with sqlite3.connect(DB_PATH) as db:
+                (updated_at,) = db.execute(
+                    "SELECT updated_at FROM salary_records WHERE id = ?", (rec["id"],)
+                ).fetchone()
+            # save()/update() store 'YYYY-MM-DD HH:MM:SS...'; a 'T' separator
+            # would sort above every later edit.
+            self.assertEqual(updated_at[10], " ")
+
+
+class ImportCsvTest(unittest.TestCase):
+    def test_integer_columns_accept_spreadsheet_floats(self):
+        with client() as c:
+            h = login(c)
+            pid = c.post("/api/persons/", json={"name": "A"}, headers=h).json()["id"]
+            resp = import_csv(
+                c, h, f"person_id,year,month,base_salary\n{pid}.0,2024.0,3.0,5\n"
+            )
+            self.assertEqual(resp.json()["created"], 1)
+
+            (rec,) = c.get("/api/salaries/?year=2024&month=3", headers=h).json()
+            self.assertEqual(rec["base_salary"], 5.0)
+
+    def test_invalid_integer_cell_is_a_bad_request_naming_the_line(self):
+        with client() as c:
+            h = login(c)
+            pid = c.post("/api/persons/", json={"name": "A"}, headers=h).json()["id"]
+            resp = import_csv(
+                c, h, f"person_id,year,month\n{pid},2024,1\n{pid},2024,x\n"
+            )
+            self.assertEqual(resp.status_code, 400)
+            self.assertIn("第 3 行 month", resp.json()["detail"])
+
+
+class ImportXlsxTest(unittest.TestCase):
+    def test_blank_header_cell_does_not_shift_later_columns(self):
+        with client() as c:
+            h = login(c)
+            pid = c.post("/api/persons/", json={"name": "A"}, headers=h).json()["id"]
+            wb = Workbook()
+            ws = wb.active
+            ws.append(["person_id", "year", "month", None, "base_salary", "tax"])
+            ws.append([pid, 2024, 3, "ignored", 1000, 50])
+            buf = io.BytesIO()
+            wb.save(buf)
+
+            resp = c.post(
+                "/api/salaries/import",
+                files={"file": ("salaries.xlsx", buf.getvalue(), "application/xlsx")},
+                headers=h,
+            )
+            self.assertEqual(resp.json()["created"], 1)
+
+            (rec,) = c.get("/api/salaries/?year=2024&month=3", headers=h).json()
+            self.assertEqual(rec["base_salary"], 1000.0)
+            self.assertEqual(rec["tax"], 50.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
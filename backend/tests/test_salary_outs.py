@@ -0,0 +1,22 @@
+import unittest
+
+from tests import helpers  # noqa: F401  (points DATABASE_PATH at a temp file)
+
+from app.routes.salaries import build_salary_outs
+from app.schemas.salary import SalaryOut
+from app.services.payroll import PAYROLL_FIXED_FIELDS
+
+
+class BuildSalaryOutsTest(unittest.TestCase):
+    def test_sets_exactly_the_declared_fields(self):
+        rec = {"id": 1, "year": 2024, "month": 1, "note": None}
+        rec.update({f: 1 for f in PAYROLL_FIXED_FIELDS})
+        (out,) = build_salary_outs([rec], {1: {"bonus": 2.0}}, {})
+        # model_construct accepts unknown names and leaves missing ones
+        # unset, so a typo in a keyword would otherwise go unnoticed.
+        self.assertEqual(out.model_fields_set, set(SalaryOut.model_fields))
+        SalaryOut.model_validate(out.model_dump())
+
+
+if __name__ == "__main__":
+    unittest.main()
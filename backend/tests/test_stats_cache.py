@@ -0,0 +1,109 @@
+import unittest
+
+from tests.helpers import client, import_csv, login
+
+from app.services import stats_cache
+
+
+class StatsCacheFreshnessTest(unittest.TestCase):
+    def test_edit_after_import_is_seen_by_other_workers(self):
+        with client() as c:
+            h = login(c)
+            pid = c.post("/api/persons/", json={"name": "A"}, headers=h).json()["id"]
+            for month in (1, 2):
+                rec = c.post(
+                    f"/api/salaries/{pid}",
+                    json={"year": 2024, "month": month, "base_salary": 1},
+                    headers=h,
+                ).json()
+            # The import updates January; the later edit touches February.
+            import_csv(c, h, f"person_id,year,month,base_salary\n{pid},2024,1,5\n")
+
+            monthly = c.get("/api/stats/monthly", headers=h).json()
+            self.assertEqual([m["base_salary"] for m in monthly], [5.0, 1.0])
+
+            # Undo this worker's invalidation, as if the edit happened in
+            # another process; only the data tag can expose the change.
+            generations = dict(stats_cache._generations)
+            c.put(f"/api/salaries/{rec['id']}", json={"base_salary": 7}, headers=h)
+            stats_cache._generations.clear()
+            stats_cache._generations.update(generations)
+
+            monthly = c.get("/api/stats/monthly", headers=h).json()
+            self.assertEqual([m["base_salary"] for m in monthly], [5.0, 7.0])
+
+    def test_field_changes_are_seen_by_other_workers(self):
+        with client() as c:
+            h = login(c)
+            pid = c.post("/api/persons/", json={"name": "A"}, headers=h).json()["id"]
+            field = c.post(
+                "/api/salary-fields/",
+                json={
+                    "name": "Meal",
+                    "field_key": "meal",
+                    "field_type": "income",
+                    "category": "welfare",
+                },
+                headers=h,
+            ).json()
+            import_csv(c, h, f"person_id,year,month,meal\n{pid},2024,1,10\n")
+
+            (row,) = c.get("/api/stats/monthly", headers=h).json()
+            self.assertEqual(row["non_cash_benefits"], 0.0)
+
+            generations = dict(stats_cache._generations)
+            c.put(
+                f"/api/salary-fields/{field['id']}",
+                json={"is_non_cash": True},
+                headers=h,
+            )
+            stats_cache._generations.clear()
+            stats_cache._generations.update(generations)
+
+            (row,) = c.get("/api/stats/monthly", headers=h).json()
+            self.assertEqual(row["non_cash_benefits"], 10.0)
+
+    def test_responses_are_cached_under_their_request_key(self):
+        with client() as c:
+            h = login(c)
+            pid = c.post("/api/persons/", json={"name": "A"}, headers=h).json()["id"]
+            import_csv(c, h, f"person_id,year,month,tax\n{pid},2024,1,3\n")
+
+            for path, name in (
+                ("monthly", "monthly"),
+                ("income-composition", "composition"),
+                ("deductions/breakdown", "deductions"),
+            ):
+                before = set(stats_cache._cache)
+                first = c.get(f"/api/stats/{path}", headers=h).json()
+                (key,) = set(stats_cache._cache) - before
+                self.assertEqual(key[2], name)
+                self.assertEqual(c.get(f"/api/stats/{path}", headers=h).json(), first)
+
+    def test_empty_results_take_the_cached_path(self):
+        with client() as c:
+            h = login(c)
+            before = set(stats_cache._cache)
+            self.assertEqual(c.get("/api/stats/monthly", headers=h).json(), [])
+            (key,) = set(stats_cache._cache) - before
+            self.assertEqual(key[2], "monthly")
+
+    def test_large_bodies_are_streamed_but_not_cached(self):
+        with client() as c:
+            h = login(c)
+            pid = c.post("/api/persons/", json={"name": "A"}, headers=h).json()["id"]
+            rows = "".join(
+                f"{pid},{2000 + i // 12},{i % 12 + 1},1\n" for i in range(1200)
+            )
+            import_csv(c, h, "person_id,year,month,base_salary\n" + rows)
+
+            before = len(stats_cache._cache)
+            resp = c.get("/api/stats/income-composition", headers=h)
+            self.assertEqual(len(resp.json()), 1200)
+            limit = stats_cache.STATS_CACHE_MAX_BODY_BYTES
+            self.assertGreater(len(resp.content), limit)
+            self.assertEqual(len(stats_cache._cache), before)
+
+
+if __name__ == "__main__":
+    unittest.main()